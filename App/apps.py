@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AppConfig(AppConfig):
     name = 'App'
+
+    def ready(self):
+        from App.checks import check_premise_checkers, check_shared_cache, \
+            check_shared_cache_deploy
+        checks.register(check_premise_checkers)
+        checks.register(check_shared_cache)
+        checks.register(check_shared_cache_deploy, deploy=True)
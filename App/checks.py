@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core import checks
+from django.db import DatabaseError
+
+# 只在本进程内可见的缓存后端，写入方的失效通知无法到达其他进程
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_premise_checkers(app_configs, **kwargs):
+    """启动时检查每个要求都注册了检测函数"""
+    from App.models import Premise
+    from Base.premise_checker import PremiseChecker
+
+    try:
+        premise_names = set(Premise.objects.values_list('name', flat=True))
+    except DatabaseError:
+        # 数据表尚未迁移
+        return []
+
+    return [
+        checks.Warning(
+            '要求%s没有注册检测函数' % name,
+            hint='在Base/premise_checker.py中用@premise_checker(%r)注册' % name,
+            obj='Premise',
+            id='App.W001',
+        ) for name in sorted(premise_names - PremiseChecker.names())
+    ]
+
+
+def _shared_cache_message():
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return None
+    return dict(
+        msg='默认缓存%s只在进程内可见，其他进程收不到失效通知，修改密码、解绑应用等操作无法及时生效' % backend,
+        hint='将CACHES["default"]指向memcached或redis等多进程共享的后端',
+    )
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """
+    认证纪元、权限注册表、要求检测结果依赖多进程共享的缓存传递失效
+    开发服务器、测试等单进程运行时只给出警告
+    """
+    message = _shared_cache_message()
+    return [checks.Warning(id='App.W002', **message)] if message else []
+
+
+def check_shared_cache_deploy(app_configs, **kwargs):
+    """部署检查（manage.py check --deploy）中进程内缓存是错误"""
+    message = _shared_cache_message()
+    return [checks.Error(id='App.E001', **message)] if message else []
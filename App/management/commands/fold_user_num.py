@@ -0,0 +1,16 @@
+""" 并入应用用户人数的分片计数
+
+绑定时用户人数计入随机分片，分片数随时间增长，应定期（如每小时由cron）执行：
+python manage.py fold_user_num
+"""
+from django.core.management import BaseCommand
+
+from App.models import AppUserNumShard
+
+
+class Command(BaseCommand):
+    help = '将应用用户人数的分片计数并入App.user_num'
+
+    def handle(self, *args, **options):
+        count = AppUserNumShard.fold()
+        self.stdout.write('%s apps folded' % count)
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.5 on 2026-10-17 10:12
+
+import SmartDjango.models.fields
+from django.db import migrations
+
+
+def fill_scope_mask(apps, schema_editor):
+    App = apps.get_model('App', 'App')
+    for app in App.objects.prefetch_related('scopes'):
+        mask = 0
+        for scope in app.scopes.all():
+            mask |= 1 << (scope.pk - 1)
+        App.objects.filter(pk=app.pk).update(scope_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0023_app_test_redirect_uri'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='app',
+            name='scope_mask',
+            field=SmartDjango.models.fields.BigIntegerField(default=0, verbose_name='应用权限位掩码，与scopes保持一致'),
+        ),
+        migrations.RunPython(fill_scope_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.5 on 2026-10-17 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0024_app_scope_mask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='app',
+            index=models.Index(fields=['create_time', 'id'], name='App_app_create__b9f9fa_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 2.2.5 on 2026-10-17 12:20
+
+import SmartDjango.models.fields
+from django.db import migrations
+
+# 迁移时的先验，与settings中APP_MARK_PRIOR_MEAN、APP_MARK_PRIOR_COUNT一致
+PRIOR_MEAN = 3
+PRIOR_COUNT = 5
+
+
+def fill_mark_counts(apps, schema_editor):
+    App = apps.get_model('App', 'App')
+    for app_id, mark in App.objects.values_list('pk', 'mark'):
+        counts = list(map(int, mark.split('-')))
+        mark_num = sum(counts)
+        mark_sum = sum(star * count for star, count in enumerate(counts, start=1))
+        App.objects.filter(pk=app_id).update(
+            mark_1=counts[0],
+            mark_2=counts[1],
+            mark_3=counts[2],
+            mark_4=counts[3],
+            mark_5=counts[4],
+            mark_average=mark_sum / mark_num if mark_num else 0,
+            mark_score=(mark_sum + PRIOR_MEAN * PRIOR_COUNT) / (mark_num + PRIOR_COUNT)
+            if mark_num else 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0025_app_create_time_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='app',
+            name='mark_1',
+            field=SmartDjango.models.fields.PositiveIntegerField(default=0, verbose_name='评1分人数'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_2',
+            field=SmartDjango.models.fields.PositiveIntegerField(default=0, verbose_name='评2分人数'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_3',
+            field=SmartDjango.models.fields.PositiveIntegerField(default=0, verbose_name='评3分人数'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_4',
+            field=SmartDjango.models.fields.PositiveIntegerField(default=0, verbose_name='评4分人数'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_5',
+            field=SmartDjango.models.fields.PositiveIntegerField(default=0, verbose_name='评5分人数'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_average',
+            field=SmartDjango.models.fields.FloatField(default=0, verbose_name='平均评分，评分时更新'),
+        ),
+        migrations.AddField(
+            model_name='app',
+            name='mark_score',
+            field=SmartDjango.models.fields.FloatField(default=0, verbose_name='贝叶斯平均评分，评分人数少时向先验均值收缩，评分时更新'),
+        ),
+        migrations.RunPython(fill_mark_counts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='app',
+            name='mark',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.5 on 2026-10-17 13:20
+
+import SmartDjango.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0026_app_mark_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='app',
+            name='user_num',
+            field=SmartDjango.models.fields.IntegerField(default=0, verbose_name='用户人数，不含尚未并入的分片计数'),
+        ),
+        migrations.CreateModel(
+            name='AppUserNumShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', SmartDjango.models.fields.PositiveSmallIntegerField(verbose_name='分片编号')),
+                ('count', SmartDjango.models.fields.IntegerField(default=0, verbose_name='分片内新增人数')),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_num_shards', to='App.App')),
+            ],
+            options={
+                'abstract': False,
+                'default_manager_name': 'objects',
+                'unique_together': {('app', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.5 on 2026-10-17 15:10
+
+import SmartDjango.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0027_appusernumshard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userapp',
+            name='unbind_time',
+            field=SmartDjango.models.fields.FloatField(default=0, verbose_name='上一次解绑的时间，此前签发的token即使重新绑定也不再有效'),
+        ),
+    ]
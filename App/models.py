@@ -1,11 +1,20 @@
+import base64
 import datetime
+import json
+import random
 
 from SmartDjango import models, E, BaseError, P
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.utils.crypto import get_random_string
 
+from Base.id_allocator import IdAllocator, insert_with_ids
 from Base.jtoken import JWType, JWT
-from Base.premise_checker import PremiseCheckerError
+from Base.premise_checker import PremiseChecker, PremiseCache
+from Base.serializer import serialize
 from Config.models import CI
+from account.settings import APP_LIST_STREAM_CHUNK, APP_MARK_PRIOR_MEAN, APP_MARK_PRIOR_COUNT, \
+    APP_USER_NUM_SHARDS, APP_USER_NUM_CACHE_TTL
 
 
 @E.register(id_processor=E.idp_cls_prefix())
@@ -15,6 +24,7 @@ class AppError:
 
     CREATE_SCOPE = E("创建权限错误")
     SCOPE_NOT_FOUND = E("不存在的权限")
+    SCOPE_LIMIT = E("权限ID不能超过{0}")
 
     APP_NOT_FOUND = E("不存在的应用")
     CREATE_APP = E("创建应用错误")
@@ -32,6 +42,11 @@ class AppError:
     APP_SECRET = E("错误的应用密钥")
 
     ILLEGAL_ACCESS_RIGHT = E("非法访问权限")
+    ILLEGAL_CURSOR = E("错误的分页游标")
+
+
+APP_IDS = IdAllocator('app-id', 8)
+USER_APP_IDS = IdAllocator('user-app-id', 8)
 
 
 class Premise(models.Model):
@@ -83,32 +98,16 @@ class Premise(models.Model):
 
     @classmethod
     def list_to_premise_list(cls, premises):
-        premise_list = []
+        """按名称批量获取要求，一次查询，忽略不存在的名称与非字符串项"""
         if not isinstance(premises, list):
             return []
-        for premise_name in premises:
-            try:
-                premise_list.append(cls.get_by_name(premise_name))
-            except Exception:
-                pass
-        return premise_list
+        names = list(dict.fromkeys(name for name in premises if isinstance(name, str)))
+        premise_dict = cls.objects.filter(name__in=names).in_bulk(field_name='name')
+        return [premise_dict[name] for name in names if name in premise_dict]
 
     @staticmethod
     def get_checker(p_name):
-        c_name = p_name[0]
-        for i in range(1, len(p_name)):
-            if p_name[i].isupper() and not p_name[i - 1].isupper():
-                c_name += '_'
-                c_name += p_name[i]
-            elif p_name[i].isupper() and p_name[i - 1].isupper() and p_name[i + 1].islower():
-                c_name += '_'
-                c_name += p_name[i]
-            else:
-                c_name += p_name[i]
-        checker_name = c_name.lower() + '_checker'
-
-        from Base.premise_checker import PremiseChecker
-        return getattr(PremiseChecker, checker_name, None)
+        return PremiseChecker.get(p_name)
 
 
 class Scope(models.Model):
@@ -146,31 +145,58 @@ class Scope(models.Model):
         except Exception:
             raise AppError.SCOPE_NOT_FOUND
 
+    # 应用权限位掩码存于有符号64位整数，只能容纳ID为1至63的权限
+    MAX_BIT_ID = 63
+
     @classmethod
     def create(cls, name, desc, detail):
         try:
-            scope = cls(
-                name=name,
-                desc=desc,
-                detail=detail,
-                always=None,
-            )
-            scope.save()
+            with transaction.atomic():
+                scope = cls(
+                    name=name,
+                    desc=desc,
+                    detail=detail,
+                    always=None,
+                )
+                scope.save()
+                if scope.pk > cls.MAX_BIT_ID:
+                    raise AppError.SCOPE_LIMIT(cls.MAX_BIT_ID)
+        except E as e:
+            raise e
         except Exception:
             raise AppError.CREATE_SCOPE
+
+        from Base.scope import ScopeRegistry
+        ScopeRegistry.reload()
         return scope
 
     def d(self):
         return self.dictify('name', 'desc', 'always', 'detail')
 
+    @property
+    def bit(self):
+        """权限在应用权限位掩码中对应的位"""
+        if self.pk > self.MAX_BIT_ID:
+            raise AppError.SCOPE_LIMIT(self.MAX_BIT_ID)
+        return 1 << (self.pk - 1)
+
+    @staticmethod
+    def to_mask(scopes):
+        mask = 0
+        for scope in scopes:
+            mask |= scope.bit
+        return mask
+
     @classmethod
     def list_to_scope_list(cls, scopes):
+        """按名称从权限注册表解析，不查询数据库"""
+        from Base.scope import ScopeRegistry
         scope_list = []
         if not isinstance(scopes, list):
             return []
-        for scope_name in scopes:
+        for scope_name in dict.fromkeys(name for name in scopes if isinstance(name, str)):
             try:
-                scope = cls.get_by_name(scope_name)
+                scope = ScopeRegistry.get(scope_name)
                 if scope.always != False:  # 此处不能将 != False 删除 因为要考虑None的情况
                     scope_list.append(scope)
             except Exception:
@@ -181,10 +207,8 @@ class Scope(models.Model):
 
     @classmethod
     def double_check(cls, scope_list):
-        final_list = []
-        for scope in cls.objects.all():
-            if scope.always:
-                final_list.append(scope)
+        from Base.scope import ScopeRegistry
+        final_list = ScopeRegistry.always()
         for scope in scope_list:
             if scope.always is None:  # false被忽略，true已经添加
                 final_list.append(scope)
@@ -249,9 +273,18 @@ class App(models.Model):
         blank=True,
         max_length=1024,
     )
-    mark = models.SlugField(
-        default='0-0-0-0-0',
-        verbose_name='1-5分评分人数',
+    mark_1 = models.PositiveIntegerField(default=0, verbose_name='评1分人数')
+    mark_2 = models.PositiveIntegerField(default=0, verbose_name='评2分人数')
+    mark_3 = models.PositiveIntegerField(default=0, verbose_name='评3分人数')
+    mark_4 = models.PositiveIntegerField(default=0, verbose_name='评4分人数')
+    mark_5 = models.PositiveIntegerField(default=0, verbose_name='评5分人数')
+    mark_average = models.FloatField(
+        default=0,
+        verbose_name='平均评分，评分时更新',
+    )
+    mark_score = models.FloatField(
+        default=0,
+        verbose_name='贝叶斯平均评分，评分人数少时向先验均值收缩，评分时更新',
     )
     info = models.TextField(
         default=None,
@@ -260,11 +293,20 @@ class App(models.Model):
     )
     user_num = models.IntegerField(
         default=0,
-        verbose_name='用户人数',
+        verbose_name='用户人数，不含尚未并入的分片计数',
     )
     create_time = models.DateTimeField(
         default=None,
     )
+    scope_mask = models.BigIntegerField(
+        default=0,
+        verbose_name='应用权限位掩码，与scopes保持一致',
+    )
+
+    class Meta(models.Model.Meta):
+        indexes = [
+            models.Index(fields=['create_time', 'id']),
+        ]
 
     @classmethod
     def get_by_name(cls, name):
@@ -290,13 +332,7 @@ class App(models.Model):
 
     @classmethod
     def get_unique_app_id(cls):
-        while True:
-            app_id = get_random_string(length=8)
-            try:
-                cls.get_by_id(app_id)
-            except E as e:
-                if e.eis(AppError.APP_NOT_FOUND):
-                    return app_id
+        return APP_IDS.next()
 
     @classmethod
     def create(cls, name, desc, redirect_uri, test_redirect_uri, scopes, premises, owner):
@@ -307,7 +343,6 @@ class App(models.Model):
             app = cls(
                 name=name,
                 desc=desc,
-                id=cls.get_unique_app_id(),
                 secret=get_random_string(length=32),
                 redirect_uri=redirect_uri,
                 test_redirect_uri=test_redirect_uri,
@@ -316,9 +351,10 @@ class App(models.Model):
                 info=None,
                 create_time=crt_time,
             )
-            app.save()
+            insert_with_ids(app, id=APP_IDS)
             app.scopes.add(*scopes)
             app.premises.add(*premises)
+            app.scope_mask = Scope.to_mask(scopes)
             app.save()
         except Exception as err:
             raise AppError.CREATE_APP(debug_message=err)
@@ -334,18 +370,26 @@ class App(models.Model):
         self.desc = desc
         self.info = info
         self.redirect_uri = redirect_uri
-        for scope in self.scopes.all():
-            self.scopes.remove(scope)
-        self.scopes.add(*scopes)
-        for premise in self.premises.all():
-            self.premises.remove(premise)
-        self.premises.add(*premises)
+        self.scopes.set(scopes)
+        self.scope_mask = Scope.to_mask(scopes)
+        self.premises.set(premises)
         self.field_change_time = datetime.datetime.now().timestamp()
         try:
             self.save()
         except Exception as err:
             raise AppError.MODIFY_APP(debug_message=err)
 
+        from Base.epoch import AuthEpoch
+        AuthEpoch.invalidate(AuthEpoch.APP, self.id)
+
+    def remove(self):
+        """删除应用及其绑定关系，相关token随之失效"""
+        from Base.epoch import AuthEpoch
+        AuthEpoch.invalidate(AuthEpoch.APP, self.id)
+        for user_app_id in self.userapp_set.values_list('user_app_id', flat=True):
+            AuthEpoch.invalidate(AuthEpoch.USER_APP, user_app_id)
+        self.delete()
+
     def _readable_app_name(self):
         return self.name
 
@@ -365,14 +409,29 @@ class App(models.Model):
     def _readable_create_time(self):
         return self.create_time.timestamp()
 
+    def _readable_user_num(self):
+        if 'user_num_shards' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.user_num + sum(shard.count for shard in self.user_num_shards.all())
+        if hasattr(self, 'shard_user_num'):
+            # 查询时以annotate_user_num汇总了分片
+            return self.user_num + (self.shard_user_num or 0)
+        return AppUserNumShard.get_user_num(self)
+
+    @staticmethod
+    def annotate_user_num(objects):
+        """在同一条查询中汇总各分片计数，供无法预取的逐行读取使用"""
+        return objects.annotate(shard_user_num=models.Sum('user_num_shards__count'))
+
     def _readable_app_info(self):
         return self.info
 
     def _readable_owner(self):
         return self.owner.d_base()
 
+    MARK_FIELDS = ('mark_1', 'mark_2', 'mark_3', 'mark_4', 'mark_5')
+
     def _readable_mark(self):
-        return list(map(int, self.mark.split('-')))
+        return [getattr(self, field) for field in self.MARK_FIELDS]
 
     def mark_as_list(self):
         return self._readable_mark()
@@ -385,11 +444,18 @@ class App(models.Model):
         premises = self.premises.all()
         return list(map(lambda p: p.d(), premises))
 
+    D_FIELDS = (
+        'app_name', 'app_id', 'app_desc', 'app_info', 'user_num', ('logo', False),
+        'redirect_uri', 'create_time', 'owner', 'mark', 'mark_average', 'mark_score',
+        'scopes', 'premises', 'test_redirect_uri')
+    D_BASE_FIELDS = ('app_name', 'app_id', 'logo', 'app_desc', 'user_num', 'create_time')
+
+    # 字段依赖的关联，供批量序列化预取
+    SELECT_RELATED = dict(owner='owner')
+    PREFETCH_RELATED = dict(scopes='scopes', premises='premises', user_num='user_num_shards')
+
     def d(self):
-        return self.dictify(
-            'app_name', 'app_id', 'app_desc', 'app_info', 'user_num', ('logo', False),
-            'redirect_uri', 'create_time', 'owner', 'mark', 'scopes', 'premises',
-            'test_redirect_uri')
+        return self.dictify(*self.D_FIELDS)
 
     def d_user(self, user):
         dict_ = self.d()
@@ -397,7 +463,15 @@ class App(models.Model):
         return dict_
 
     def d_base(self):
-        return self.dictify('app_name', 'app_id', 'logo', 'app_desc', 'user_num', 'create_time')
+        return self.dictify(*self.D_BASE_FIELDS)
+
+    @classmethod
+    def dict_list(cls, objects, fields=None):
+        """
+        批量序列化，结果与逐个调用d_base（或指定字段的dictify）相同，查询数与应用数无关
+        :param objects: QuerySet或应用列表
+        """
+        return serialize(objects, fields or cls.D_BASE_FIELDS)
 
     def modify_logo(self, logo):
         """修改应用logo"""
@@ -414,29 +488,120 @@ class App(models.Model):
     def authentication(self, app_secret):
         return self.secret == app_secret
 
-    def check_premise(self, user):
+    @staticmethod
+    def _premise_dicts(premise_list, results):
         premises = []
-        for premise in self.premises.all():
-            checker = Premise.get_checker(premise.name)
-            if checker and callable(checker):
-                try:
-                    checker(user)
-                    raise BaseError.OK
-                except E as e:
-                    error = e
-            else:
-                error = PremiseCheckerError.CHECKER_NOT_FOUND
+        for premise in premise_list:
+            identifier, msg = results[premise.name]
             p_dict = premise.d()
             p_dict['check'] = dict(
-                identifier=error.identifier,
-                msg=error.message,
+                identifier=identifier,
+                msg=msg,
             )
             premises.append(p_dict)
         return premises
 
+    def check_premise(self, user):
+        premise_list = list(self.premises.all())
+        results = PremiseCache.check(user, [premise.name for premise in premise_list])
+        return App._premise_dicts(premise_list, results)
+
+    @classmethod
+    def check_premise_batch(cls, app_ids, user):
+        """
+        批量检测用户能否使用各应用，一次预取全部要求，每个不同的要求只检测一次
+        :return: {应用ID: dict(usable, premises)}，不存在的应用ID被忽略
+        """
+        app_list = list(cls.objects.filter(pk__in=app_ids).prefetch_related('premises'))
+        premise_names = {premise.name for app in app_list for premise in app.premises.all()}
+        results = PremiseCache.check(user, premise_names)
+
+        eligibility = dict()
+        for app in app_list:
+            premise_list = app.premises.all()
+            eligibility[app.id] = dict(
+                usable=all(E.sid2e[results[premise.name][0]].ok for premise in premise_list),
+                premises=App._premise_dicts(premise_list, results),
+            )
+        return eligibility
+
+    def eligible_users(self):
+        """满足应用全部要求的用户，一次SQL查询，要求须为声明式规则"""
+        from User.models import User
+        return User.objects.filter(
+            PremiseChecker.q([premise.name for premise in self.premises.all()]))
+
     @classmethod
     def list(cls):
-        return cls.objects.all().dict(cls.d_base)
+        return cls.dict_list(cls.objects.all())
+
+    @staticmethod
+    def encode_cursor(app):
+        raw = json.dumps([app.create_time.isoformat(), app.id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """游标为上一页最后一个应用的(create_time, id)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            create_time, app_id = json.loads(raw)
+            return datetime.datetime.fromisoformat(create_time), str(app_id)
+        except Exception as err:
+            raise AppError.ILLEGAL_CURSOR(debug_message=err)
+
+    @classmethod
+    def _keyset(cls, cursor):
+        objects = cls.objects.order_by('create_time', 'id')
+        if cursor:
+            create_time, app_id = cursor
+            objects = objects.filter(
+                models.Q(create_time__gt=create_time) |
+                models.Q(create_time=create_time, id__gt=app_id))
+        return objects
+
+    @classmethod
+    def list_page(cls, cursor, count):
+        """
+        按(create_time, id)键集分页
+        :param cursor: decode_cursor的结果，None表示第一页
+        :return: dict(object_list, next)，next为None表示没有下一页
+        """
+        apps = list(cls._keyset(cursor)[:count + 1])
+        next_cursor = cls.encode_cursor(apps[count - 1]) if len(apps) > count else None
+        return dict(
+            object_list=cls.dict_list(apps[:count]),
+            next=next_cursor,
+        )
+
+    @classmethod
+    def list_stream(cls, cursor, count=None):
+        """
+        逐行生成JSON响应，数据库游标分块读取，不在内存中组装完整列表
+        响应格式与list_page经HttpPackMiddleware打包后相同
+        """
+        envelope = BaseError.OK().d()
+        envelope.pop('body', None)
+        yield json.dumps(envelope, ensure_ascii=False)[:-1] + ', "body": {"object_list": ['
+
+        objects = cls.annotate_user_num(cls._keyset(cursor))
+        if count is not None:
+            objects = objects[:count + 1]
+
+        last = None
+        index = 0
+        for app in objects.iterator(chunk_size=APP_LIST_STREAM_CHUNK):
+            if count is not None and index == count:
+                break
+            yield (', ' if index else '') + json.dumps(app.d_base(), ensure_ascii=False)
+            last = app
+            index += 1
+        else:
+            # 没有第count + 1个应用，即没有下一页
+            last = None
+
+        next_cursor = cls.encode_cursor(last) if last else None
+        yield '], "next": %s}}' % json.dumps(next_cursor)
 
 
 class UserApp(models.Model):
@@ -458,6 +623,10 @@ class UserApp(models.Model):
         default=False,
         verbose_name='用户是否绑定应用',
     )
+    unbind_time = models.FloatField(
+        default=0,
+        verbose_name='上一次解绑的时间，此前签发的token即使重新绑定也不再有效',
+    )
     last_auth_code_time = models.CharField(
         default=None,
         verbose_name='上一次申请auth_code的时间，防止被多次使用',
@@ -500,15 +669,20 @@ class UserApp(models.Model):
             raise AppError.APP_UNBINDED
         return user_app
 
+    @classmethod
+    def get_principal(cls, user_app_id):
+        """一次查询取得绑定关系、应用以及用户"""
+        try:
+            user_app = cls.objects.select_related('app', 'user').get(user_app_id=user_app_id)
+        except cls.DoesNotExist:
+            raise AppError.USER_APP_NOT_FOUND
+        if not user_app.bind:
+            raise AppError.APP_UNBINDED
+        return user_app
+
     @classmethod
     def get_unique_id(cls):
-        while True:
-            user_app_id = get_random_string(length=8)
-            try:
-                cls.get_by_id(user_app_id)
-            except E as e:
-                if e.eis(AppError.USER_APP_NOT_FOUND):
-                    return user_app_id
+        return USER_APP_IDS.next()
 
     @classmethod
     def do_bind(cls, user, app):
@@ -527,21 +701,22 @@ class UserApp(models.Model):
             user_app.frequent_score += 1
             user_app.last_score_changed_time = crt_timestamp
             user_app.save()
+
+            from Base.epoch import AuthEpoch
+            AuthEpoch.invalidate(AuthEpoch.USER_APP, user_app.user_app_id)
         except E as e:
             if e.eis(AppError.USER_APP_NOT_FOUND):
                 try:
                     user_app = cls(
                         user=user,
                         app=app,
-                        user_app_id=cls.get_unique_id(),
                         bind=True,
                         last_auth_code_time=crt_timestamp,
                         frequent_score=1,
                         last_score_changed_time=crt_timestamp,
                     )
-                    user_app.save()
-                    user_app.app.user_num += 1
-                    user_app.app.save()
+                    insert_with_ids(user_app, user_app_id=USER_APP_IDS)
+                    AppUserNumShard.incr(app.pk)
                 except Exception as err:
                     raise AppError.BIND_USER_APP(debug_message=err)
             else:
@@ -552,6 +727,15 @@ class UserApp(models.Model):
             ctime=crt_timestamp
         ), replace=False, expire_second=5 * 60)
 
+    def do_unbind(self):
+        """解绑应用，该绑定关系下的所有token随之失效，重新绑定后也不恢复"""
+        self.bind = False
+        self.unbind_time = datetime.datetime.now().timestamp()
+        self.save()
+
+        from Base.epoch import AuthEpoch
+        AuthEpoch.invalidate(AuthEpoch.USER_APP, self.user_app_id)
+
     @classmethod
     def check_bind(cls, user, app):
         try:
@@ -583,19 +767,108 @@ class UserApp(models.Model):
                     user_app.save()
 
     def do_mark(self, mark):
+        """
+        评分，各分值人数在数据库中原子增减，平均分与贝叶斯评分在同一事务中由计数重新计算
+        """
         if mark < 1 or mark > 5:
             raise AppError.MARK
-        original_mark = self.mark
-        self.mark = mark
-        self.save()
 
-        mark_list = list(map(int, self.app.mark.split('-')))
-        if 5 >= original_mark > 0:
-            mark_list[original_mark - 1] -= 1
-        mark_list[mark - 1] += 1
-        self.app.mark = '-'.join(map(str, mark_list))
-        self.app.save()
+        with transaction.atomic():
+            original_mark = UserApp.objects.select_for_update().values_list(
+                'mark', flat=True).get(pk=self.pk)
+            self.mark = mark
+            if original_mark != mark:
+                UserApp.objects.filter(pk=self.pk).update(mark=mark)
+
+                counts = {App.MARK_FIELDS[mark - 1]: models.F(App.MARK_FIELDS[mark - 1]) + 1}
+                if 5 >= original_mark > 0:
+                    field = App.MARK_FIELDS[original_mark - 1]
+                    counts[field] = models.F(field) - 1
+                apps = App.objects.filter(pk=self.app_id)
+                apps.update(**counts)
+
+                # 第二条语句读取的是本事务中已更新的计数，行锁持续到提交
+                mark_num = sum((models.F(field) for field in App.MARK_FIELDS), models.Value(0))
+                mark_sum = sum((models.F(field) * star
+                                for star, field in enumerate(App.MARK_FIELDS, start=1)),
+                               models.Value(0))
+                apps.update(
+                    mark_average=models.ExpressionWrapper(
+                        mark_sum * 1.0 / mark_num, output_field=models.FloatField()),
+                    mark_score=models.ExpressionWrapper(
+                        (mark_sum + APP_MARK_PRIOR_MEAN * APP_MARK_PRIOR_COUNT) * 1.0 /
+                        (mark_num + APP_MARK_PRIOR_COUNT), output_field=models.FloatField()),
+                )
+        self.app.refresh_from_db(fields=App.MARK_FIELDS + ('mark_average', 'mark_score'))
+
+
+class AppUserNumShard(models.Model):
+    """
+    应用用户人数的分片计数
+    绑定时随机选择一个分片原子加一，避免所有绑定争用同一App行
+    应用用户人数 = App.user_num + 各分片之和，由python manage.py fold_user_num定期并入App.user_num
+    """
+    app = models.ForeignKey(
+        'App.App',
+        on_delete=models.CASCADE,
+        related_name='user_num_shards',
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name='分片编号',
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='分片内新增人数',
+    )
+
+    class Meta(models.Model.Meta):
+        unique_together = ('app', 'shard')
 
+    @staticmethod
+    def _cache_key(app_id):
+        return 'app-user-num:%s' % app_id
+
+    @classmethod
+    def incr(cls, app_id):
+        shard = random.randrange(APP_USER_NUM_SHARDS)
+        shards = cls.objects.filter(app_id=app_id, shard=shard)
+        if not shards.update(count=models.F('count') + 1):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(app_id=app_id, shard=shard, count=1)
+            except IntegrityError:
+                # 另一个请求刚刚创建了这个分片
+                shards.update(count=models.F('count') + 1)
+        cache.delete(cls._cache_key(app_id))
+
+    @classmethod
+    def get_user_num(cls, app):
+        """应用用户人数，缓存APP_USER_NUM_CACHE_TTL秒"""
+        key = cls._cache_key(app.pk)
+        user_num = cache.get(key)
+        if user_num is None:
+            shard_sum = cls.objects.filter(app_id=app.pk).aggregate(
+                total=models.Sum('count'))['total'] or 0
+            user_num = app.user_num + shard_sum
+            cache.set(key, user_num, APP_USER_NUM_CACHE_TTL)
+        return user_num
+
+    @classmethod
+    def fold(cls):
+        """
+        将各分片并入App.user_num，返回并入的应用数
+        分片按读到的计数扣减而非直接删除，并入期间的绑定计数留在分片中，不依赖行锁也不会丢失
+        """
+        app_ids = set(cls.objects.values_list('app_id', flat=True))
+        for app_id in app_ids:
+            with transaction.atomic():
+                counts = list(cls.objects.filter(app_id=app_id).values_list('pk', 'count'))
+                for pk, count in counts:
+                    cls.objects.filter(pk=pk).update(count=models.F('count') - count)
+                total = sum(count for _, count in counts)
+                App.objects.filter(pk=app_id).update(user_num=models.F('user_num') + total)
+                cls.objects.filter(app_id=app_id, count=0).delete()
+        return len(app_ids)
 
 class AppP:
     name, info, desc, redirect_uri, test_redirect_uri, secret = App.P(
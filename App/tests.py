@@ -1,3 +1,149 @@
+import json
+from unittest import mock
+
+from SmartDjango import E
+from django.db import connection
+from django.db.models import QuerySet
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from App.models import App, UserApp, Scope, Premise, AppError, AppUserNumShard
+from Base.auth import Auth
+from Base.epoch import AuthEpoch
+from Base.jtoken import JWT, JWType
+from Config.models import Config, CI
+from User.models import User
+
+
+class UserAppTestCase(TestCase):
+    def setUp(self):
+        Config.update_many({
+            CI.PROJECT_SECRET_KEY: 'test-secret-key',
+            CI.JWT_ENCODE_ALGO: 'HS256',
+        })
+        scope = Scope.create('readBaseInfo', '读取基本信息', '读取基本信息')
+        self.user = User.create('+8613800000000', 'pwd123')
+        self.user.verify_status = User.VERIFY_STATUS_DONE
+        self.user.save()
+        self.app = App.create(
+            name='test-app',
+            desc='desc',
+            redirect_uri='http://a.com',
+            test_redirect_uri='http://b.com',
+            scopes=[scope],
+            premises=[],
+            owner=self.user,
+        )
+
+    def get_user(self, token):
+        response = self.client.get('/user/', HTTP_TOKEN=token)
+        return json.loads(response.content)['identifier']
+
+    def auth_token(self, user_app):
+        token, _ = JWT.encrypt(dict(
+            user_app_id=user_app.user_app_id,
+            type=JWType.AUTH_TOKEN,
+        ))
+        return token
+
+    def test_unbind_then_rebind(self):
+        """解绑前签发的token在重新绑定后仍然无效"""
+        UserApp.do_bind(self.user, self.app)
+        user_app = UserApp.get_by_user_app(self.user, self.app)
+        old_token = self.auth_token(user_app)
+        self.assertEqual(self.get_user(old_token), 'OK')
+
+        user_app.do_unbind()
+        self.assertNotEqual(self.get_user(old_token), 'OK')
+
+        UserApp.do_bind(self.user, self.app)
+        self.assertNotEqual(self.get_user(old_token), 'OK')
+
+        user_app = UserApp.get_by_user_app(self.user, self.app)
+        self.assertEqual(self.get_user(self.auth_token(user_app)), 'OK')
+
+    def test_app_list_queries(self):
+        """应用列表批量序列化，查询数与应用数无关"""
+        token = Auth.get_login_token(self.user)['token']
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get('/app/?relation=owner', HTTP_TOKEN=token)
+            body = json.loads(response.content)['body']
+            return len(body), len(context.captured_queries)
+
+        count_queries()
+        app_num, queries = count_queries()
+        for i in range(4):
+            App.create('test-app-%s' % i, 'desc', 'http://a.com', 'http://b.com',
+                       [], [], self.user)
+        self.assertEqual(count_queries(), (app_num + 4, queries))
+
+    def test_create_app_with_malformed_entries(self):
+        """权限、要求列表中的非字符串项被忽略"""
+        Premise.create('realVerified', '实名认证', '需要实名认证')
+        token = Auth.get_login_token(self.user)['token']
+        response = self.client.post('/app/', json.dumps(dict(
+            name='malformed-app',
+            desc='desc',
+            redirect_uri='http://a.com',
+            test_redirect_uri='http://b.com',
+            scopes=[['readBaseInfo'], {'name': 'readBaseInfo'}, 'readBaseInfo', 'readBaseInfo'],
+            premises=[['realVerified'], {}, 'realVerified'],
+        )), content_type='application/json', HTTP_TOKEN=token)
+        self.assertEqual(json.loads(response.content)['identifier'], 'OK')
+
+        app = App.objects.get(name='malformed-app')
+        self.assertEqual([scope.name for scope in app.scopes.all()], ['readBaseInfo'])
+        self.assertEqual([premise.name for premise in app.premises.all()], ['realVerified'])
+
+    def test_remove_app(self):
+        """删除应用后，缓存的认证纪元随之失效"""
+        UserApp.do_bind(self.user, self.app)
+        user_app = UserApp.get_by_user_app(self.user, self.app)
+        token = self.auth_token(user_app)
+        self.assertEqual(self.get_user(token), 'OK')
+
+        self.app.remove()
+        with self.assertRaises(E) as context:
+            AuthEpoch.app(self.app.id)
+        self.assertTrue(context.exception.eis(AppError.APP_NOT_FOUND))
+        with self.assertRaises(E) as context:
+            AuthEpoch.user_app(user_app.user_app_id)
+        self.assertTrue(context.exception.eis(AppError.USER_APP_NOT_FOUND))
+        self.assertNotEqual(self.get_user(token), 'OK')
+
+    def test_fold_user_num_with_concurrent_binds(self):
+        """并入分片期间发生的绑定、解绑不会丢失或重复计数"""
+        users = [User.create('+86138000001%02d' % i, 'pwd123') for i in range(6)]
+        with mock.patch('App.models.random.randrange', return_value=0):
+            for user in users[:3]:
+                UserApp.do_bind(user, self.app)
+
+        values_list = QuerySet.values_list
+        binds = []
+
+        def concurrent_values_list(queryset, *fields, **kwargs):
+            result = values_list(queryset, *fields, **kwargs)
+            if queryset.model is AppUserNumShard and fields == ('pk', 'count') and not binds:
+                # 读取分片计数之后、扣减之前，另一个请求绑定、解绑
+                result = list(result)
+                for user in users[3:]:
+                    binds.append(UserApp.do_bind(user, self.app))
+                UserApp.get_by_user_app(users[0], self.app).do_unbind()
+            return result
+
+        # 全部计入同一分片，并入期间的绑定必定落在已读取的分片上
+        with mock.patch('App.models.random.randrange', return_value=0), \
+                mock.patch.object(QuerySet, 'values_list', concurrent_values_list):
+            AppUserNumShard.fold()
+        self.assertEqual(len(binds), 3)
+
+        self.app.refresh_from_db()
+        self.assertEqual(AppUserNumShard.get_user_num(self.app), 6)
+        self.assertEqual(self.app.user_num, 3)
 
-# Create your tests here.
+        AppUserNumShard.fold()
+        self.app.refresh_from_db()
+        self.assertEqual(self.app.user_num, 6)
+        self.assertFalse(AppUserNumShard.objects.filter(app=self.app).exists())
@@ -8,9 +8,11 @@ urlpatterns = [
     path('scope', views.ScopeV.as_view()),
     path('premise', views.PremiseV.as_view()),
     path('logo', views.AppLogo.as_view()),
+    path('eligibility', views.AppEligibility.as_view()),
     path('@refresh-frequent-score', views.refresh_frequent_score),
 
     path('user/<str:user_app_id>', views.UserAppId.as_view()),
     path('<str:app_id>', views.AppID.as_view()),
     path('<str:app_id>/secret', views.AppIDSecret.as_view()),
+    path('<str:app_id>/eligible-users', views.AppIDEligibleUsers.as_view()),
 ]
@@ -1,14 +1,36 @@
 import datetime
 
-from SmartDjango import P, Analyse
+from SmartDjango import P, Analyse, ModelError
 from SmartDjango.models import Pager, Page
+from django.http import StreamingHttpResponse
 from django.views import View
 
-from App.models import App, Scope, UserApp, Premise, AppError, AppP
+from App.models import App, UserApp, Premise, AppError, AppP
 from Base.auth import Auth
 from Base.policy import Policy
 from Base.qn import qn_public_manager
-from Base.scope import SI
+from Base.scope import SI, ScopeRegistry
+
+
+ELIGIBILITY_MAX_APPS = 100
+
+
+def app_ids_process(app_ids):
+    if not isinstance(app_ids, list) or len(app_ids) > ELIGIBILITY_MAX_APPS:
+        raise ModelError.FIELD_FORMAT
+    if not all(isinstance(app_id, str) for app_id in app_ids):
+        raise ModelError.FIELD_FORMAT
+    return app_ids
+
+
+APP_LIST_DEFAULT_COUNT = 20
+APP_LIST_MAX_COUNT = 100
+
+
+def list_count_process(count):
+    if count <= 0 or count > APP_LIST_MAX_COUNT:
+        raise ModelError.FIELD_FORMAT
+    return count
 
 
 def relation_process(relation):
@@ -35,21 +57,21 @@ class AppV(View):
         relation = r.d.relation
 
         if relation == App.R_OWNER:
-            return App.objects.filter(owner=user).dict(App.d_base)
+            return App.dict_list(App.objects.filter(owner=user))
         elif relation == App.R_NONE:
             count = r.d.count
             last_time = r.d.last_time
             pager = Pager(compare_field='create_time')
             page = App.objects.page(pager, last_time, count)  # type: Page
-            return page.object_list.dict(App.d_base)
+            return App.dict_list(page.object_list)
         else:
             frequent = r.d.frequent
             count = r.d.count
-            objects = UserApp.objects.filter(user=user, bind=True)
+            objects = UserApp.objects.filter(user=user, bind=True).select_related('app')
             if frequent:
                 pager = Pager(mode=Pager.CHOOSE_AMONG, order_by=('-frequent_score', ))
                 objects = objects.page(pager, 0, count).object_list
-            return list(map(lambda o: o.app.d_base(), objects))
+            return App.dict_list([o.app for o in objects])
 
     @staticmethod
     @Analyse.r([AppP.name, AppP.desc, AppP.redirect_uri, AppP.test_redirect_uri,
@@ -66,9 +88,39 @@ class AppV(View):
 
 class AppList(View):
     @staticmethod
-    def get(_):
-        """GET /app/list"""
-        return App.list()
+    @Analyse.r(q=[
+        P('cursor', '分页游标').null().process(App.decode_cursor),
+        P('count', '每页应用数').null().process(int).process(list_count_process),
+        P('stream', '流式响应').default(0).process(int),
+    ])
+    def get(r):
+        """ GET /app/list
+
+        公开应用列表，不带参数时返回全部应用
+        带cursor或count时按创建时间分页，返回dict(object_list, next)，next作为下一页的cursor
+        stream=1时逐行流式返回，不带count时返回cursor之后的全部应用
+        """
+        cursor, count = r.d.cursor, r.d.count
+        if r.d.stream:
+            return StreamingHttpResponse(
+                App.list_stream(cursor, count),
+                content_type="application/json; encoding=utf-8",
+            )
+        if cursor is None and count is None:
+            return App.list()
+        return App.list_page(cursor, count or APP_LIST_DEFAULT_COUNT)
+
+
+class AppEligibility(View):
+    @staticmethod
+    @Analyse.r([P('app_ids', '应用ID列表').process(app_ids_process)])
+    @Auth.require_login(deny_auth_token=True)
+    def post(r):
+        """ POST /api/app/eligibility
+
+        批量获取当前用户能否使用各应用及各要求的检测结果
+        """
+        return App.check_premise_batch(r.d.app_ids, r.user)
 
 
 class AppIDSecret(View):
@@ -86,6 +138,24 @@ class AppIDSecret(View):
         return app.secret
 
 
+class AppIDEligibleUsers(View):
+    @staticmethod
+    @Analyse.r(a=[AppP.app])
+    @Auth.require_login(deny_auth_token=True)
+    def get(r):
+        """ GET /api/app/:app_id/eligible-users
+
+        满足应用全部要求的用户数
+        """
+        user = r.user
+        app = r.d.app
+
+        if not app.belong(user):
+            raise AppError.APP_NOT_BELONG
+
+        return dict(count=app.eligible_users().count())
+
+
 class AppID(View):
     @staticmethod
     @Analyse.r(a=[AppP.app])
@@ -151,19 +221,19 @@ class AppID(View):
 
         删除应用
         """
-        app = r.user
+        user = r.user
         app = r.d.app
 
-        if not app.belong(app):
+        if not app.belong(user):
             raise AppError.APP_NOT_BELONG
 
-        app.delete()
+        app.remove()
 
 
 class ScopeV(View):
     @staticmethod
     def get(r):
-        return Scope.objects.dict(Scope.d)
+        return [scope.d() for scope in ScopeRegistry.all()]
 
 
 class PremiseV(View):
@@ -243,6 +313,20 @@ class UserAppId(View):
         user_app.do_mark(mark)
         return user_app.app.mark_as_list()
 
+    @staticmethod
+    @Analyse.r(a=[AppP.user_app])
+    @Auth.require_login(deny_auth_token=True)
+    def delete(r):
+        """ DELETE /api/app/user/:user_app_id
+
+        解绑应用
+        """
+        user_app = r.d.user_app
+        if user_app.user.user_str_id != r.user.user_str_id:
+            raise AppError.ILLEGAL_ACCESS_RIGHT
+
+        user_app.do_unbind()
+
 
 @Analyse.r(method='GET')
 def refresh_frequent_score(r):
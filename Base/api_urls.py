@@ -11,4 +11,5 @@ urlpatterns = [
     path('errors', views.Error.as_view()),
     path('regions', views.Region.as_view()),
     path('recaptcha', views.ReCaptcha.as_view()),
+    path('auth-timing', views.AuthTiming.as_view()),
 ]
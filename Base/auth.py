@@ -1,9 +1,17 @@
+import asyncio
+import hashlib
 from functools import wraps
 
 from SmartDjango import E
+from django.utils.functional import SimpleLazyObject
 
+from Base.epoch import AuthEpoch
 from Base.jtoken import JWT, JWType
+from Base.lru import LRUCache
+from Base.revocation import Revocation
+from Base.timing import Timing, PhaseTimer
 from User.models import User
+from account.settings import AUTH_TOKEN_CACHE_SIZE
 
 
 @E.register()
@@ -16,17 +24,58 @@ class AuthError:
     REQUIRE_ROOT = E("需要管理员登录")
     DENY_ALL_AUTH_TOKEN = E("拒绝第三方认证请求")
     SCOPE_NOT_SATISFIED = E("没有获取权限：[{0}]")
+    TOKEN_REVOKED = E("认证已注销")
     REQUIRE_AUTH_CODE = E("需要身份认证code")
     NEW_AUTH_CODE_CREATED = E("授权失效")
 
 
+class TokenCache:
+    """已验证token的声明缓存
+
+    以(签名配置版本, token字符串的摘要)为键，条目不会存活超过token的ctime + expire
+    签名密钥或算法变化后旧条目不再命中，用旧密钥签名的token须重新验证
+    """
+    _cache = LRUCache(max_size=AUTH_TOKEN_CACHE_SIZE)
+
+    @staticmethod
+    def digest(jwt_str):
+        return hashlib.sha256(jwt_str.encode()).digest()
+
+    @classmethod
+    def decrypt(cls, jwt_str, digest=None):
+        key = (JWT.generation(), digest or cls.digest(jwt_str))
+        dict_ = cls._cache.get(key)
+        if dict_ is None:
+            dict_ = JWT.decrypt(jwt_str)
+            cls._cache.set(key, dict_, expire_at=dict_['ctime'] + dict_['expire'])
+        return dict(dict_)
+
+    @classmethod
+    def stats(cls):
+        return cls._cache.stats()
+
+
 class Auth:
     @staticmethod
     def validate_token(r):
         jwt_str = r.META.get('HTTP_TOKEN')
         if jwt_str is None:
             raise AuthError.REQUIRE_LOGIN
-        return JWT.decrypt(jwt_str)
+        digest = TokenCache.digest(jwt_str)
+        dict_ = TokenCache.decrypt(jwt_str, digest)
+        if Revocation.is_revoked(digest):
+            raise AuthError.TOKEN_REVOKED
+        return dict_
+
+    @staticmethod
+    def revoke_token(r):
+        """注销请求所携带的token"""
+        jwt_str = r.META.get('HTTP_TOKEN')
+        if jwt_str is None:
+            raise AuthError.REQUIRE_LOGIN
+        digest = TokenCache.digest(jwt_str)
+        dict_ = TokenCache.decrypt(jwt_str, digest)
+        Revocation.revoke(digest, dict_['ctime'] + dict_['expire'])
 
     @staticmethod
     def get_login_token(user: User):
@@ -39,7 +88,7 @@ class Auth:
         return dict_
 
     @classmethod
-    def _extract_user(cls, r):
+    def _extract_user(cls, r, timer=None):
         r.user = None
 
         dict_ = Auth.validate_token(r)
@@ -52,13 +101,17 @@ class Auth:
         if not type_:
             raise AuthError.TOKEN_MISS_PARAM('type')
 
+        if timer:
+            timer.mark('decode')
+
+        # 先通过认证纪元判断token是否有效，用户与绑定关系在视图首次访问时才加载
         if type_ == JWType.LOGIN_TOKEN:
             user_id = dict_.get('user_id')
             if not user_id:
                 raise AuthError.TOKEN_MISS_PARAM('user_id')
 
-            from User.models import User
-            user = User.get_by_str_id(user_id)
+            user = SimpleLazyObject(lambda: User.get_by_str_id(user_id))
+            user_app_epoch = app_epoch = None
 
         elif type_ == JWType.AUTH_TOKEN:
             user_app_id = dict_.get('user_app_id')
@@ -66,17 +119,32 @@ class Auth:
                 raise AuthError.TOKEN_MISS_PARAM('user_app_id')
 
             from App.models import UserApp
-            user_app = UserApp.get_by_id(user_app_id, check_bind=True)
+            user_app_epoch = AuthEpoch.user_app(user_app_id)
+            app_epoch = AuthEpoch.app(user_app_epoch['app_id'])
 
-            if float(user_app.app.field_change_time) > ctime:
-                raise AuthError.APP_FIELD_CHANGE
-            user = user_app.user
+            user_id = user_app_epoch['user_id']
+            user_app = SimpleLazyObject(lambda: UserApp.get_principal(user_app_id))
+            user = SimpleLazyObject(lambda: user_app.user)
             r.user_app = user_app
+            r.scope_mask = app_epoch['scope_mask']
         else:
             raise AuthError.ERROR_TOKEN_TYPE
 
-        if float(user.pwd_change_time) > ctime:
+        user_epoch = AuthEpoch.user(user_id)
+        if timer:
+            timer.mark('lookup')
+
+        if user_app_epoch:
+            if not user_app_epoch['bind'] or user_app_epoch.get('unbind_time', 0) > ctime:
+                from App.models import AppError
+                raise AppError.APP_UNBINDED
+            if app_epoch['field_change_time'] > ctime:
+                raise AuthError.APP_FIELD_CHANGE
+
+        if user_epoch['pwd_change_time'] > ctime:
             raise AuthError.PASSWORD_CHANGED
+        if timer:
+            timer.mark('epoch')
 
         r.user = user
         r.type_ = type_
@@ -84,36 +152,141 @@ class Auth:
     @classmethod
     def require_login(cls, scope_list=None, deny_auth_token=False, allow_no_login=False,
                       require_root=False):
+        """
+        :param scope_list: 所需权限名称（SI），首次校验第三方token时由ScopeRegistry解析
+        """
+        from App.models import Scope
+        from Base.scope import ScopeRegistry
+        scope_names = [getattr(scope, 'name', scope) for scope in scope_list or []]
+        resolved = dict(generation=None, scopes=[], mask=0)
+
+        def resolve_scopes():
+            generation = ScopeRegistry.generation()
+            if resolved['generation'] != generation:
+                scopes = [ScopeRegistry.get(name) for name in scope_names]
+                resolved.update(generation=generation, scopes=scopes, mask=Scope.to_mask(scopes))
+            return resolved['scopes'], resolved['mask']
+
+        def authorize(r, timer=None):
+            try:
+                cls._extract_user(r, timer)
+            except Exception as err:
+                if allow_no_login and not require_root:
+                    return
+                else:
+                    raise AuthError.REQUIRE_LOGIN(debug_message=err)
+
+            if require_root:
+                user = r.user
+                if user.pk != User.ROOT_ID:
+                    raise AuthError.REQUIRE_ROOT
+
+            if r.type_ != JWType.AUTH_TOKEN:
+                return
+
+            if deny_auth_token:
+                raise AuthError.DENY_ALL_AUTH_TOKEN
+
+            if scope_names:
+                scopes, scope_mask = resolve_scopes()
+                if r.scope_mask & scope_mask != scope_mask:
+                    for scope in scopes:
+                        if not r.scope_mask & scope.bit:
+                            raise AuthError.SCOPE_NOT_SATISFIED(scope.desc)
+            if timer:
+                timer.mark('scope')
+
         def decorator(func):
-            @wraps(func)
-            def wrapper(r, *args, **kwargs):
-                _scope_list = scope_list or []
+            sink = Timing.sink
+            view = '%s.%s' % (func.__module__, func.__qualname__)
 
-                try:
-                    cls._extract_user(r)
-                except Exception as err:
-                    if allow_no_login and not require_root:
-                        return func(r, *args, **kwargs)
-                    else:
-                        raise AuthError.REQUIRE_LOGIN(debug_message=err)
-
-                if require_root:
-                    user = r.user
-                    from User.models import User
-                    if user.pk != User.ROOT_ID:
-                        raise AuthError.REQUIRE_ROOT
-
-                if r.type_ != JWType.AUTH_TOKEN:
-                    return func(r, *args, **kwargs)
+            if asyncio.iscoroutinefunction(func):
+                from asgiref.sync import sync_to_async
 
-                if deny_auth_token:
-                    raise AuthError.DENY_ALL_AUTH_TOKEN
+                def authorize_sync(r, timer):
+                    authorize(r, timer)
+                    if r.user is not None:
+                        # 在同步线程中加载用户，异步视图访问r.user时不再查询数据库
+                        getattr(r.user, 'pk')
 
-                app = r.user_app.app
-                for score in _scope_list:
-                    if score not in app.scopes.all():
-                        raise AuthError.SCOPE_NOT_SATISFIED(score.desc)
-                return func(r, *args, **kwargs)
+                @wraps(func)
+                async def async_wrapper(r, *args, **kwargs):
+                    timer = PhaseTimer() if sink else None
+                    try:
+                        await sync_to_async(authorize_sync)(r, timer)
+                        response = await func(r, *args, **kwargs)
+                        if timer:
+                            timer.mark('view')
+                        return response
+                    finally:
+                        if timer:
+                            sink.record(view, timer.phases)
+                return async_wrapper
 
-            return wrapper
+            if sink is None:
+                @wraps(func)
+                def wrapper(r, *args, **kwargs):
+                    authorize(r)
+                    return func(r, *args, **kwargs)
+                return wrapper
+
+            @wraps(func)
+            def timed_wrapper(r, *args, **kwargs):
+                timer = PhaseTimer()
+                try:
+                    authorize(r, timer)
+                    response = func(r, *args, **kwargs)
+                    timer.mark('view')
+                    return response
+                finally:
+                    sink.record(view, timer.phases)
+            return timed_wrapper
         return decorator
+
+    @staticmethod
+    def introspect(app, token_list):
+        """
+        批量校验属于应用的第三方认证token
+        :param app: 发起校验的应用，其他应用的token一律视为无效
+        :param token_list: token字符串列表
+        """
+        from App.models import UserApp
+
+        claims = []
+        for token in token_list:
+            try:
+                digest = TokenCache.digest(token)
+                dict_ = TokenCache.decrypt(token, digest)
+                if Revocation.is_revoked(digest):
+                    dict_ = None
+            except Exception:
+                dict_ = None
+            if dict_ and (dict_.get('type') != JWType.AUTH_TOKEN or
+                          not dict_.get('user_app_id')):
+                dict_ = None
+            claims.append(dict_)
+
+        user_app_ids = set(dict_['user_app_id'] for dict_ in claims if dict_)
+        user_apps = dict()
+        if user_app_ids:
+            for user_app in UserApp.objects.filter(
+                    user_app_id__in=user_app_ids, app=app).select_related('user'):
+                user_apps[user_app.user_app_id] = user_app
+        scopes = [scope.name for scope in app.scopes.all()]
+
+        results = []
+        for dict_ in claims:
+            user_app = dict_ and user_apps.get(dict_['user_app_id'])
+            if not user_app or not user_app.bind \
+                    or user_app.unbind_time > dict_['ctime'] \
+                    or float(app.field_change_time) > dict_['ctime'] \
+                    or float(user_app.user.pwd_change_time) > dict_['ctime']:
+                results.append(dict(active=False))
+                continue
+            results.append(dict(
+                active=True,
+                user_app_id=user_app.user_app_id,
+                scopes=scopes,
+                expire_time=dict_['ctime'] + dict_['expire'],
+            ))
+        return results
@@ -0,0 +1,38 @@
+""" 布隆过滤器
+
+元素为已经均匀分布的摘要（如sha256），直接由摘要派生各个位置，不再额外计算哈希
+"""
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        :param capacity: 预计元素个数，超出后误判率上升
+        :param error_rate: 达到容量时的误判率
+        """
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes):
+        for position in self._positions(digest):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def full(self):
+        return self.count > self.capacity
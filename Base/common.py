@@ -1,7 +1,7 @@
 """ 171203 Adel Liu """
 from SmartDjango import NetPacker, Hc
 
-from Config.models import Config, CI
+from Config.models import LazyConfig, CI
 
 
 def md5(s):
@@ -22,6 +22,6 @@ def sha1(s):
 NetPacker.customize(fixed_http_code=Hc.OK)
 NetPacker.set_mode(debug=False)
 
-SECRET_KEY = Config.get_value_by_key(CI.PROJECT_SECRET_KEY)
-JWT_ENCODE_ALGO = Config.get_value_by_key(CI.JWT_ENCODE_ALGO)
-HOST = Config.get_value_by_key(CI.HOST)
+SECRET_KEY = LazyConfig(CI.PROJECT_SECRET_KEY)
+JWT_ENCODE_ALGO = LazyConfig(CI.JWT_ENCODE_ALGO)
+HOST = LazyConfig(CI.HOST)
@@ -0,0 +1,87 @@
+""" 认证纪元
+
+token是否有效只取决于少量字段：用户的密码修改时间、应用的信息修改时间与权限位掩码、
+用户与应用的绑定关系及上一次解绑时间。这些字段缓存于进程内LRU，并以Django缓存作为多进程、多节点共享的第二级，
+写入方负责失效。其他进程的进程内条目最多在AUTH_EPOCH_LOCAL_TTL秒后过期。
+共享缓存必须是多进程共享的后端（见App.checks），条目只存活AUTH_EPOCH_CACHE_TTL秒，
+即使失效与并发读取交错、旧值被重新写回，也只会多存活这么久。
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from Base.lru import LRUCache
+from account.settings import AUTH_EPOCH_LOCAL_SIZE, AUTH_EPOCH_LOCAL_TTL, AUTH_EPOCH_CACHE_TTL
+
+
+class AuthEpoch:
+    USER = 'user'
+    APP = 'app'
+    USER_APP = 'user-app'
+
+    _local = LRUCache(max_size=AUTH_EPOCH_LOCAL_SIZE, ttl=AUTH_EPOCH_LOCAL_TTL)
+
+    @staticmethod
+    def _key(kind, id_):
+        return 'auth-epoch:%s:%s' % (kind, id_)
+
+    @classmethod
+    def _get(cls, kind, id_, loader):
+        key = cls._key(kind, id_)
+        value = cls._local.get(key)
+        if value is None:
+            value = cache.get(key)
+            if value is None:
+                value = loader(id_)
+                cache.set(key, value, AUTH_EPOCH_CACHE_TTL)
+            cls._local.set(key, value)
+        return value
+
+    @classmethod
+    def invalidate(cls, kind, id_):
+        key = cls._key(kind, id_)
+        cache.delete(key)
+        cls._local.delete(key)
+        # 事务提交前读到旧值的请求可能在上面删除之后写回，提交后再删除一次
+        transaction.on_commit(lambda: cache.delete(key))
+
+    @staticmethod
+    def _load_user(user_str_id):
+        from User.models import User, UserError
+        try:
+            pwd_change_time = User.objects.values_list('pwd_change_time', flat=True).get(
+                user_str_id=user_str_id)
+        except User.DoesNotExist:
+            raise UserError.USER_NOT_FOUND
+        return dict(pwd_change_time=float(pwd_change_time or 0))
+
+    @staticmethod
+    def _load_app(app_id):
+        from App.models import App, AppError
+        try:
+            field_change_time, scope_mask = App.objects.values_list(
+                'field_change_time', 'scope_mask').get(pk=app_id)
+        except App.DoesNotExist:
+            raise AppError.APP_NOT_FOUND
+        return dict(field_change_time=float(field_change_time or 0), scope_mask=scope_mask)
+
+    @staticmethod
+    def _load_user_app(user_app_id):
+        from App.models import UserApp, AppError
+        try:
+            user_id, app_id, bind, unbind_time = UserApp.objects.values_list(
+                'user__user_str_id', 'app_id', 'bind', 'unbind_time').get(user_app_id=user_app_id)
+        except UserApp.DoesNotExist:
+            raise AppError.USER_APP_NOT_FOUND
+        return dict(user_id=user_id, app_id=app_id, bind=bind, unbind_time=unbind_time)
+
+    @classmethod
+    def user(cls, user_str_id):
+        return cls._get(cls.USER, user_str_id, cls._load_user)
+
+    @classmethod
+    def app(cls, app_id):
+        return cls._get(cls.APP, app_id, cls._load_app)
+
+    @classmethod
+    def user_app(cls, user_app_id):
+        return cls._get(cls.USER_APP, user_app_id, cls._load_user_app)
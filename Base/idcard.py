@@ -4,16 +4,28 @@ from SmartDjango import E
 from qcloud_image import Client
 from qcloud_image import CIUrls
 
-from Config.models import Config, CI
+from Config.models import LazyConfig, CI
 
-APP_ID = Config.get_value_by_key(CI.QCLOUD_APP_ID)
-SECRET_ID = Config.get_value_by_key(CI.QCLOUD_SECRET_ID)
-SECRET_KEY = Config.get_value_by_key(CI.QCLOUD_SECRET_KEY)
+APP_ID = LazyConfig(CI.QCLOUD_APP_ID)
+SECRET_ID = LazyConfig(CI.QCLOUD_SECRET_ID)
+SECRET_KEY = LazyConfig(CI.QCLOUD_SECRET_KEY)
 
 BUCKET = 'BUCKET'
-client = Client(APP_ID, SECRET_ID, SECRET_KEY, BUCKET)
-client.use_http()
-client.set_timeout(30)
+
+_client = None
+_client_keys = None
+
+
+def get_client():
+    """腾讯云识别客户端，密钥配置变化时重新构造"""
+    global _client, _client_keys
+    keys = (APP_ID.value, SECRET_ID.value, SECRET_KEY.value)
+    if _client_keys != keys:
+        client = Client(*keys, BUCKET)
+        client.use_http()
+        client.set_timeout(30)
+        _client, _client_keys = client, keys
+    return _client
 
 
 @E.register(id_processor=E.idp_cls_prefix())
@@ -29,7 +41,7 @@ class IDCardError:
 class IDCard:
     @staticmethod
     def detect_front(link):
-        resp = client.idcard_detect(CIUrls([link]), 0)
+        resp = get_client().idcard_detect(CIUrls([link]), 0)
         if resp['httpcode'] != 200:
             raise IDCardError.IDCARD_DETECT_ERROR(resp['result_list'][0]['message'])
         resp = resp['result_list'][0]
@@ -51,7 +63,7 @@ class IDCard:
 
     @staticmethod
     def detect_back(link):
-        resp = client.idcard_detect(CIUrls([link]), 1)
+        resp = get_client().idcard_detect(CIUrls([link]), 1)
         if resp['httpcode'] != 200:
             raise IDCardError.IDCARD_DETECT_ERROR(resp['result_list'][0]['message'])
         resp = resp['result_list'][0]
@@ -2,12 +2,25 @@
 
 第一次使用jwt身份认证技术
 """
-import datetime
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import time
 
 import jwt
 from SmartDjango import E
+from jwt.algorithms import get_default_algorithms
 
 from Base.common import SECRET_KEY, JWT_ENCODE_ALGO
+from account.settings import JWT_ASYMMETRIC_ALGO, JWT_KEY_DIR, JWT_ACTIVE_KID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class JWType:
@@ -21,41 +34,236 @@ class JWTError:
     JWT_EXPIRED = E("认证过期")
     ERROR_JWT_FORMAT = E("错误的认证格式")
     JWT_PARAM_INCOMPLETE = E("认证参数不完整")
+    KEY_NOT_FOUND = E("不存在的签名密钥")
 
 
-class JWT:
+def _json_dumps(obj):
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _json_loads(bytes_):
+    if orjson:
+        return orjson.loads(bytes_)
+    return json.loads(bytes_)
+
+
+def _b64encode(bytes_):
+    return base64.urlsafe_b64encode(bytes_).rstrip(b'=')
+
+
+def _b64decode(bytes_):
+    return base64.urlsafe_b64decode(bytes_ + b'=' * (-len(bytes_) % 4))
+
+
+class HMACCodec:
+    """
+    预先处理好密钥与头部的HMAC签名编解码器，每个进程构造一次
+    生成的token与PyJWT完全兼容，头部不同的token（如带kid或旧版PyJWT生成）交由PyJWT处理
+    """
+    DIGESTS = dict(
+        HS256=hashlib.sha256,
+        HS384=hashlib.sha384,
+        HS512=hashlib.sha512,
+    )
+
+    def __init__(self, key, algorithm):
+        self.key = key
+        self.algorithm = algorithm
+        self._mac = hmac.new(key.encode(), digestmod=self.DIGESTS[algorithm])
+        self.header = _b64encode(_json_dumps(dict(alg=algorithm, typ='JWT')))
+        self._prefix = self.header.decode() + '.'
+
+    def _sign(self, signing_input):
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, payload):
+        signing_input = self.header + b'.' + _b64encode(_json_dumps(payload))
+        return (signing_input + b'.' + _b64encode(self._sign(signing_input))).decode()
+
+    def match(self, str_):
+        return str_.startswith(self._prefix)
+
+    def decode(self, str_):
+        try:
+            signing_input, signature = str_.encode().rsplit(b'.', 1)
+            payload = signing_input.split(b'.', 1)[1]
+            signature = _b64decode(signature)
+            dict_ = _json_loads(_b64decode(payload))
+        except (ValueError, IndexError, binascii.Error) as err:
+            raise jwt.DecodeError(err)
+        if not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise jwt.InvalidSignatureError('Signature verification failed')
+        if not isinstance(dict_, dict):
+            raise jwt.DecodeError('Invalid payload')
+        return dict_
+
+
+class KeyRing:
+    """
+    非对称签名密钥环，应用可通过JWKS获取公钥离线验证token
+    密钥目录的修改时间变化（增删密钥文件）后各进程自动重新载入，无需重启；
+    遇到未知kid时也会重新载入，每RELOAD_INTERVAL秒至多一次
+    """
+    RELOAD_INTERVAL = 1
+
+    _keys = None
+    _mtime = None
+    _last_reload = 0
+    _generation = 0
+
     @staticmethod
-    def encrypt(dict_, replace=True, expire_second=7 * 60 * 60 * 24):
+    def enabled():
+        return bool(JWT_ASYMMETRIC_ALGO)
+
+    @staticmethod
+    def _dir_mtime():
+        try:
+            return os.stat(JWT_KEY_DIR).st_mtime_ns
+        except OSError:
+            return None
+
+    @classmethod
+    def reload(cls):
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+        mtime = cls._dir_mtime()
+        keys = dict()
+        if os.path.isdir(JWT_KEY_DIR):
+            for filename in sorted(os.listdir(JWT_KEY_DIR)):
+                kid, ext = os.path.splitext(filename)
+                if ext != '.pem':
+                    continue
+                with open(os.path.join(JWT_KEY_DIR, filename), 'rb') as f:
+                    keys[kid] = load_pem_private_key(f.read(), password=None)
+        cls._keys, cls._mtime = keys, mtime
+        cls._last_reload = time.time()
+        cls._generation += 1
+
+    @classmethod
+    def keys(cls):
+        if cls._keys is None or cls._dir_mtime() != cls._mtime:
+            cls.reload()
+        return cls._keys
+
+    @classmethod
+    def _find(cls, kid):
+        keys = cls.keys()
+        if kid not in keys and time.time() - cls._last_reload >= cls.RELOAD_INTERVAL:
+            cls.reload()
+            keys = cls._keys
+        if kid not in keys:
+            raise JWTError.KEY_NOT_FOUND
+        return keys[kid]
+
+    @classmethod
+    def generation(cls):
+        """密钥环的载入次数，密钥增删后改变"""
+        if cls.enabled():
+            cls.keys()
+        return cls._generation
+
+    @classmethod
+    def active(cls):
+        keys = cls.keys()
+        kid = JWT_ACTIVE_KID or (max(keys) if keys else None)
+        return kid, cls._find(kid)
+
+    @classmethod
+    def public_key(cls, kid):
+        return cls._find(kid).public_key()
+
+    @classmethod
+    def jwks(cls):
+        if not cls.enabled():
+            return []
+        algorithm = get_default_algorithms()[JWT_ASYMMETRIC_ALGO]
+        jwks = []
+        for kid, key in cls.keys().items():
+            jwk = json.loads(algorithm.to_jwk(key.public_key()))
+            jwk.update(kid=kid, alg=JWT_ASYMMETRIC_ALGO, use='sig')
+            jwks.append(jwk)
+        return jwks
+
+
+class JWT:
+    _codec = None
+    _codec_config = None
+    _generation = 0
+
+    @classmethod
+    def codec(cls):
+        """密钥或算法配置变化时重新构造编解码器，非HMAC算法返回None"""
+        config = (SECRET_KEY.value, JWT_ENCODE_ALGO.value)
+        if config != cls._codec_config:
+            key, algorithm = config
+            cls._codec = HMACCodec(key, algorithm) if algorithm in HMACCodec.DIGESTS else None
+            cls._codec_config = config
+            cls._generation += 1
+        return cls._codec
+
+    @classmethod
+    def generation(cls):
+        """签名配置的版本，密钥、算法或密钥环变化后改变，验证结果的缓存须以此区分"""
+        cls.codec()
+        return cls._generation, KeyRing.generation()
+
+    @classmethod
+    def encrypt(cls, dict_, replace=True, expire_second=7 * 60 * 60 * 24, asymmetric=False):
         """
         jwt签名加密
         :param replace: 如果dict_中存在ctime或expire是否替换
         :param dict_: 被加密的字典数据
         :param expire_second: 过期时间
+        :param asymmetric: 启用非对称签名时，使用当前密钥签名并在头部写入kid
         """
         if replace or 'ctime' not in dict_.keys():
-            dict_['ctime'] = datetime.datetime.now().timestamp()
+            dict_['ctime'] = time.time()
         if replace or 'expire' not in dict_.keys():
             dict_['expire'] = expire_second
-        encode_str = jwt.encode(dict_, SECRET_KEY, algorithm=JWT_ENCODE_ALGO)
+        codec = cls.codec()
+        if asymmetric and KeyRing.enabled():
+            kid, key = KeyRing.active()
+            encode_str = jwt.encode(
+                dict_, key, algorithm=JWT_ASYMMETRIC_ALGO, headers=dict(kid=kid))
+        elif codec:
+            encode_str = codec.encode(dict_)
+        else:
+            encode_str = jwt.encode(dict_, SECRET_KEY.value, algorithm=JWT_ENCODE_ALGO.value)
         if isinstance(encode_str, bytes):
             encode_str = encode_str.decode()
         return encode_str, dict_
 
-    @staticmethod
-    def decrypt(str_: str):
+    @classmethod
+    def decrypt(cls, str_: str):
         """
         jwt签名解密
         :param str_: 被加密的字符串
         """
+        codec = cls.codec()
         try:
-            dict_ = jwt.decode(str_, SECRET_KEY, JWT_ENCODE_ALGO)
-        except jwt.DecodeError as err:
+            if codec and codec.match(str_):
+                dict_ = codec.decode(str_)
+            else:
+                dict_ = cls._decode(str_)
+        except jwt.InvalidTokenError as err:
             raise JWTError.ERROR_JWT_FORMAT(debug_message=err)
         if 'expire' not in dict_.keys() \
                 or 'ctime' not in dict_.keys() \
                 or not isinstance(dict_['ctime'], float) \
                 or not isinstance(dict_['expire'], int):
             raise JWTError.JWT_PARAM_INCOMPLETE
-        if datetime.datetime.now().timestamp() > dict_['ctime'] + dict_['expire']:
+        if time.time() > dict_['ctime'] + dict_['expire']:
             raise JWTError.JWT_EXPIRED
         return dict_
+
+    @staticmethod
+    def _decode(str_):
+        """PyJWT通用解码，处理非对称签名及其他头部的token"""
+        kid = jwt.get_unverified_header(str_).get('kid')
+        if kid is not None and KeyRing.enabled():
+            return jwt.decode(str_, KeyRing.public_key(kid), algorithms=[JWT_ASYMMETRIC_ALGO])
+        return jwt.decode(str_, SECRET_KEY.value, algorithms=[JWT_ENCODE_ALGO.value])
@@ -0,0 +1,73 @@
+""" 进程内LRU缓存
+
+条目数有上限，可为每个条目单独指定过期时间，并记录命中/未命中次数
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        :param max_size: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        :param ttl: 条目默认存活秒数，None表示不过期
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expire_at = item
+            if expire_at is not None and time.time() >= expire_at:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expire_at=None):
+        """
+        写入缓存
+        :param expire_at: 条目过期的时间戳，与默认ttl取较早者
+        """
+        if self.ttl is not None:
+            ttl_expire_at = time.time() + self.ttl
+            if expire_at is None or expire_at > ttl_expire_at:
+                expire_at = ttl_expire_at
+
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return dict(
+            size=len(self._data),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+        )
@@ -5,20 +5,19 @@ import html
 
 from SmartDjango import E
 
-from Config.models import Config, CI
+from Config.models import LazyConfig, CI
 from User.models import User
 
 
-SENDER_EMAIL = Config.get_value_by_key(CI.SENDER_EMAIL)
-SENDER_EMAIL_PWD = Config.get_value_by_key(CI.SENDER_EMAIL_PWD)
-SMTP_SERVER = Config.get_value_by_key(CI.SMTP_SERVER)
-SMTP_PORT = int(Config.get_value_by_key(CI.SMTP_PORT))
+SENDER_EMAIL = LazyConfig(CI.SENDER_EMAIL)
+SENDER_EMAIL_PWD = LazyConfig(CI.SENDER_EMAIL_PWD)
+SMTP_SERVER = LazyConfig(CI.SMTP_SERVER)
+SMTP_PORT = LazyConfig(CI.SMTP_PORT, process=int)
 
 
-try:
-    ROOT_USER = User.get_by_id(1).body
-except Exception:
-    pass
+def get_root_user():
+    """管理员用户，发送审核邮件时才查询"""
+    return User.get_by_id(User.ROOT_ID)
 
 
 class Element:
@@ -84,13 +83,14 @@ class Email:
     def _send(email):
         try:
             msg = MIMEText(email.output(), 'html', 'utf-8')
-            msg['From'] = formataddr(['齐天簿云服务', SENDER_EMAIL])
+            sender_email = SENDER_EMAIL.value
+            msg['From'] = formataddr(['齐天簿云服务', sender_email])
             msg['To'] = formataddr([email.user.nickname or '齐天簿用户', email.user.email])
             msg['Subject'] = '【齐天簿】' + email.subject
 
-            server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-            server.login(SENDER_EMAIL, SENDER_EMAIL_PWD)
-            server.sendmail(SENDER_EMAIL, [email.user.email], msg.as_string())
+            server = smtplib.SMTP_SSL(SMTP_SERVER.value, SMTP_PORT.value)
+            server.login(sender_email, SENDER_EMAIL_PWD.value)
+            server.sendmail(sender_email, [email.user.email], msg.as_string())
             server.quit()
         except Exception:
             raise EmailError.SEND_EMAIL_ERROR
@@ -100,7 +100,8 @@ class Email:
 
     @staticmethod
     def developer_apply(user, link):
-        if not ROOT_USER.email:
+        root_user = get_root_user()
+        if not root_user.email:
             raise EmailError.EMAIL_NOT_EXIST
         return Email(
             subject='开发者申请',
@@ -110,12 +111,13 @@ class Email:
             .a(Element('已提交了开发者申请，请'))
             .a(Element('点击链接').link(link))
             .a(Element('进行审核！')),
-            user=ROOT_USER,
+            user=root_user,
         ).send()
 
     @staticmethod
     def real_verify(user, link):
-        if not ROOT_USER.email:
+        root_user = get_root_user()
+        if not root_user.email:
             raise EmailError.EMAIL_NOT_EXIST
         return Email(
             subject='实名认证',
@@ -125,7 +127,7 @@ class Email:
             .a(Element('已提交了实名认证，请'))
             .a(Element('点击链接').link(link))
             .a(Element('进行审核！')),
-            user=ROOT_USER,
+            user=root_user,
         ).send()
 
     @staticmethod
@@ -0,0 +1,16 @@
+from django.http import StreamingHttpResponse
+from SmartDjango import E
+from SmartDjango.middleware import HttpPackMiddleware as BaseHttpPackMiddleware
+
+
+class HttpPackMiddleware(BaseHttpPackMiddleware):
+    """流式响应不是HttpResponse的子类，原样返回，其余结果仍由SmartDjango打包"""
+
+    def __call__(self, r, *args, **kwargs):
+        try:
+            response = self.get_response(r, *args, **kwargs)
+        except E as err:
+            response = err
+        if isinstance(response, StreamingHttpResponse):
+            return response
+        return BaseHttpPackMiddleware(lambda *_, **__: response)(r, *args, **kwargs)
@@ -6,10 +6,10 @@ from Base.common import HOST
 from account.settings import MAX_IMAGE_SIZE
 
 
-AVATAR_CALLBACK = '%s/user/avatar' % HOST
-LOGO_CALLBACK = '%s/app/logo' % HOST
-VERIFY_FRONT_CALLBACK = '%s/user/idcard?back=0' % HOST
-VERIFY_BACK_CALLBACK = '%s/user/idcard?back=1' % HOST
+AVATAR_CALLBACK = '%s/user/avatar'
+LOGO_CALLBACK = '%s/app/logo'
+VERIFY_FRONT_CALLBACK = '%s/user/idcard?back=0'
+VERIFY_BACK_CALLBACK = '%s/user/idcard?back=1'
 
 BASE_IMAGE_POLICY = dict(
     insertOnly=1,
@@ -19,25 +19,14 @@ BASE_IMAGE_POLICY = dict(
     mimeLimit='image/*',
 )
 
-AVATAR_POLICY = dict(
-    callbackUrl=AVATAR_CALLBACK,
-)
-AVATAR_POLICY.update(BASE_IMAGE_POLICY)
-
-LOGO_POLICY = dict(
-    callbackUrl=LOGO_CALLBACK,
-)
-LOGO_POLICY.update(BASE_IMAGE_POLICY)
 
-VERIFY_FRONT_POLICY = dict(
-    callbackUrl=VERIFY_FRONT_CALLBACK,
-)
-VERIFY_FRONT_POLICY.update(BASE_IMAGE_POLICY)
-
-VERIFY_BACK_POLICY = dict(
-    callbackUrl=VERIFY_BACK_CALLBACK,
-)
-VERIFY_BACK_POLICY.update(BASE_IMAGE_POLICY)
+def callback_policy(callback):
+    """回调地址依赖HOST配置，使用时才读取"""
+    policy = dict(
+        callbackUrl=callback % HOST.value,
+    )
+    policy.update(BASE_IMAGE_POLICY)
+    return policy
 
 
 class Policy:
@@ -47,7 +36,7 @@ class Policy:
         policy = dict(
             callbackBody='{"key":"$(key)","user_id":"%s"}' % user_id
         )
-        policy.update(AVATAR_POLICY)
+        policy.update(callback_policy(AVATAR_CALLBACK))
         return policy
 
     @staticmethod
@@ -55,7 +44,7 @@ class Policy:
         policy = dict(
             callbackBody='{"key":"$(key)","app_id":"%s"}' % app_id
         )
-        policy.update(LOGO_POLICY)
+        policy.update(callback_policy(LOGO_CALLBACK))
         return policy
 
     @staticmethod
@@ -63,7 +52,7 @@ class Policy:
         policy = dict(
             callbackBody='{"key":"$(key)","user_id":"%s"}' % user_id
         )
-        policy.update(VERIFY_FRONT_POLICY)
+        policy.update(callback_policy(VERIFY_FRONT_CALLBACK))
         return policy
 
     @staticmethod
@@ -71,5 +60,5 @@ class Policy:
         policy = dict(
             callbackBody='{"key":"$(key)","user_id":"%s"}' % user_id
         )
-        policy.update(VERIFY_BACK_POLICY)
+        policy.update(callback_policy(VERIFY_BACK_CALLBACK))
         return policy
@@ -1,8 +1,12 @@
+import abc
 import datetime
+import time
 
-from SmartDjango import E
+from SmartDjango import E, BaseError, models
+from django.core.cache import cache
 
 from User.models import User
+from account.settings import PREMISE_CACHE_TTL
 
 
 @E.register()
@@ -11,32 +15,277 @@ class PremiseCheckerError:
     CHECKER_NOT_FOUND = E("不存在的要求检测")
     DISALLOW_CHILD = E("需年满18周岁")
     REQUIRE_CHINESE_PHONE = E("仅支持中国大陆手机号注册用户")
+    REQUIRE_MIN_AGE = E("需年满{0}周岁")
+    REQUIRE_PHONE_PREFIX = E("仅支持{0}开头的手机号注册用户")
+    REQUIRE_REGION = E("需要{0}")
+    UNKNOWN_RULE = E("未知的要求规则{0}")
+    RULE_NOT_FOUND = E("要求{0}不是声明式规则，无法转为查询")
+
+
+_checkers = dict()
+_expires = dict()
+_rules = dict()
+
+
+def premise_checker(premise_name, expire=None):
+    """
+    将函数注册为名称为premise_name的要求的检测函数
+    :param expire: expire(user)返回检测结果随时间变化的时间戳，None表示只随用户信息变化
+    """
+    def decorator(func):
+        _checkers[premise_name] = func
+        if expire:
+            _expires[premise_name] = expire
+        return func
+    return decorator
+
+
+def years_after(date, years):
+    """date之后years年的日期，2月29日顺延至3月1日"""
+    try:
+        return date.replace(year=date.year + years)
+    except ValueError:
+        return datetime.date(date.year + years, 3, 1)
+
+
+def years_before(date, years):
+    """date之前years年的日期，2月29日提前至2月28日"""
+    try:
+        return date.replace(year=date.year - years)
+    except ValueError:
+        return datetime.date(date.year - years, 2, 28)
+
+
+class Rule(abc.ABC):
+    """
+    单项要求规则，同时编译为内存判断与ORM查询条件
+    match(user)判断用户是否满足，q()返回满足条件的User查询条件，
+    expire(user)返回判断结果随时间变化的时间戳
+    """
+    def __init__(self, value, error=None):
+        self.value = value
+        self.error = error or self.default_error()
+
+    @abc.abstractmethod
+    def default_error(self):
+        """不满足规则时的默认错误"""
+
+    @abc.abstractmethod
+    def match(self, user):
+        """用户是否满足规则"""
+
+    @abc.abstractmethod
+    def q(self):
+        """满足规则的User查询条件"""
+
+    def expire(self, user):
+        return None
+
+
+class VerifyStatusRule(Rule):
+    def default_error(self):
+        return PremiseCheckerError.REQUIRE_REAL_VERIFY
+
+    def match(self, user):
+        return user.verify_status == self.value
+
+    def q(self):
+        return models.Q(verify_status=self.value)
+
+
+class MinAgeRule(Rule):
+    def default_error(self):
+        return PremiseCheckerError.REQUIRE_MIN_AGE(self.value)
+
+    def match(self, user):
+        if user.birthday is None:
+            return False
+        return years_after(user.birthday, self.value) <= datetime.datetime.now().date()
+
+    def q(self):
+        return models.Q(birthday__lte=years_before(datetime.datetime.now().date(), self.value))
+
+    def expire(self, user):
+        if user.birthday is None or self.match(user):
+            return None
+        date = years_after(user.birthday, self.value)
+        return datetime.datetime.combine(date, datetime.time.min).timestamp()
+
+
+class PhonePrefixRule(Rule):
+    def default_error(self):
+        return PremiseCheckerError.REQUIRE_PHONE_PREFIX(self.value)
+
+    def match(self, user):
+        return (user.phone or '').startswith(self.value)
+
+    def q(self):
+        return models.Q(phone__startswith=self.value)
+
+
+class RegionRule(Rule):
+    def default_error(self):
+        return PremiseCheckerError.REQUIRE_REGION(dict(User.VERIFY_TUPLE).get(self.value))
+
+    def match(self, user):
+        return user.verify_status == User.VERIFY_STATUS_DONE and \
+            user.real_verify_type == self.value
+
+    def q(self):
+        return models.Q(verify_status=User.VERIFY_STATUS_DONE, real_verify_type=self.value)
+
+
+class PremiseRule:
+    """
+    声明式要求，按顺序检测各项规则，第一项不满足的规则决定错误
+    PremiseRule(verify_status=User.VERIFY_STATUS_DONE, min_age=(18, 错误))
+    规则参数可写为(参数, 错误)以替换默认错误
+    """
+    RULES = dict(
+        verify_status=VerifyStatusRule,
+        min_age=MinAgeRule,
+        phone_prefix=PhonePrefixRule,
+        region=RegionRule,
+    )
+
+    def __init__(self, **spec):
+        self.rules = []
+        for name, value in spec.items():
+            if name not in self.RULES:
+                raise PremiseCheckerError.UNKNOWN_RULE(name)
+            error = None
+            if isinstance(value, tuple):
+                value, error = value
+            self.rules.append(self.RULES[name](value, error))
+
+    def check(self, user):
+        for rule in self.rules:
+            if not rule.match(user):
+                raise rule.error
+
+    def match(self, user):
+        return all(rule.match(user) for rule in self.rules)
+
+    def q(self):
+        q = models.Q()
+        for rule in self.rules:
+            q &= rule.q()
+        return q
+
+    def expire(self, user):
+        expires = [rule.expire(user) for rule in self.rules]
+        expires = [expire for expire in expires if expire is not None]
+        return min(expires) if expires else None
+
+
+def premise_rule(premise_name, **spec):
+    """将声明式规则注册为名称为premise_name的要求的检测函数"""
+    rule = _rules[premise_name] = PremiseRule(**spec)
+    premise_checker(premise_name, expire=rule.expire)(rule.check)
+    return rule
 
 
 class PremiseChecker:
     @staticmethod
-    def real_verified_checker(user):
-        if user.verify_status != User.VERIFY_STATUS_DONE:
-            raise PremiseCheckerError.REQUIRE_REAL_VERIFY
+    def get(premise_name):
+        return _checkers.get(premise_name)
 
     @staticmethod
-    def disallow_child_checker(user):
-        if user.verify_status != User.VERIFY_STATUS_DONE:
-            raise PremiseCheckerError.REQUIRE_REAL_VERIFY
-
-        crt_date = datetime.datetime.now().date()
-        if crt_date.year < user.birthday.year + 18:
-            raise PremiseCheckerError.DISALLOW_CHILD
-        elif crt_date.year > user.birthday.year + 18:
-            return
-        elif crt_date.month < user.birthday.month:
-            raise PremiseCheckerError.DISALLOW_CHILD
-        elif crt_date.month > user.birthday.month:
-            return
-        elif crt_date.day < user.birthday.day:
-            raise PremiseCheckerError.DISALLOW_CHILD
+    def names():
+        return set(_checkers)
 
     @staticmethod
-    def chinese_phone_checker(user):
-        if not user.phone.startswith('+86'):
-            raise PremiseCheckerError.REQUIRE_CHINESE_PHONE
+    def check(premise_name, user):
+        """
+        检测用户是否满足要求
+        :return: (错误, 结果变化的时间戳)，满足要求时错误为BaseError.OK
+        """
+        checker = _checkers.get(premise_name)
+        if not checker:
+            return PremiseCheckerError.CHECKER_NOT_FOUND, None
+        try:
+            checker(user)
+            error = BaseError.OK
+        except E as e:
+            error = e
+
+        expire = _expires.get(premise_name)
+        return error, expire(user) if expire else None
+
+    @staticmethod
+    def q(premise_names):
+        """满足全部要求的User查询条件，要求须为声明式规则"""
+        q = models.Q()
+        for premise_name in premise_names:
+            rule = _rules.get(premise_name)
+            if rule is None:
+                raise PremiseCheckerError.RULE_NOT_FOUND(premise_name)
+            q &= rule.q()
+        return q
+
+
+premise_rule(
+    'realVerified',
+    verify_status=User.VERIFY_STATUS_DONE,
+)
+premise_rule(
+    'disallowChild',
+    verify_status=User.VERIFY_STATUS_DONE,
+    min_age=(18, PremiseCheckerError.DISALLOW_CHILD),
+)
+premise_rule(
+    'chinesePhone',
+    phone_prefix=('+86', PremiseCheckerError.REQUIRE_CHINESE_PHONE),
+)
+
+
+class PremiseCache:
+    """
+    按(用户, 要求)缓存检测结果，键中包含用户状态版本
+    实名状态、身份证信息、生日变化时User调用invalidate更换版本，旧结果不再命中
+    版本存于多进程共享的缓存（见App.checks），结果最多缓存PREMISE_CACHE_TTL秒
+    """
+
+    @staticmethod
+    def _version_key(user):
+        return 'premise-version:%s' % user.pk
+
+    @classmethod
+    def _version(cls, user):
+        key = cls._version_key(user)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    @classmethod
+    def invalidate(cls, user):
+        cache.set(cls._version_key(user), time.time_ns(), None)
+
+    @classmethod
+    def check(cls, user, premise_names):
+        """
+        :return: {要求名称: (错误标识, 错误信息)}
+        """
+        version = cls._version(user)
+        keys = {name: 'premise:%s:%s:%s' % (user.pk, version, name) for name in premise_names}
+        cached = cache.get_many(list(keys.values()))
+
+        results = dict()
+        crt_time = time.time()
+        for name, key in keys.items():
+            if key in cached:
+                results[name] = cached[key]
+                continue
+
+            error, expire_at = PremiseChecker.check(name, user)
+            results[name] = (error.identifier, error.message)
+            if error.eis(PremiseCheckerError.CHECKER_NOT_FOUND):
+                continue
+
+            timeout = PREMISE_CACHE_TTL
+            if expire_at is not None:
+                timeout = min(timeout, max(int(expire_at - crt_time), 1))
+            cache.set(key, results[name], timeout)
+        return results
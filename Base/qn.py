@@ -8,18 +8,15 @@ from SmartDjango import E
 from django.http import HttpRequest
 from qiniu import urlsafe_base64_encode
 
-from Base.common import HOST
-from Config.models import Config, CI
-
-ACCESS_KEY = Config.get_value_by_key(CI.QINIU_ACCESS_KEY)
-SECRET_KEY = Config.get_value_by_key(CI.QINIU_SECRET_KEY)
-RES_BUCKET = Config.get_value_by_key(CI.RES_BUCKET)
-PUBLIC_BUCKET = Config.get_value_by_key(CI.PUBLIC_BUCKET)
-RES_CDN_HOST = Config.get_value_by_key(CI.RES_CDN_HOST)
-PUBLIC_CDN_HOST = Config.get_value_by_key(CI.PUBLIC_CDN_HOST)
-
-_AUTH = qiniu.Auth(access_key=ACCESS_KEY, secret_key=SECRET_KEY)
-_HOST = HOST
+from Config.models import LazyConfig, CI
+
+ACCESS_KEY = LazyConfig(CI.QINIU_ACCESS_KEY)
+SECRET_KEY = LazyConfig(CI.QINIU_SECRET_KEY)
+RES_BUCKET = LazyConfig(CI.RES_BUCKET)
+PUBLIC_BUCKET = LazyConfig(CI.PUBLIC_BUCKET)
+RES_CDN_HOST = LazyConfig(CI.RES_CDN_HOST)
+PUBLIC_CDN_HOST = LazyConfig(CI.PUBLIC_CDN_HOST)
+
 _KEY_PREFIX = 'account/'
 
 QINIU_MANAGE_HOST = "https://rs.qiniu.com"
@@ -34,12 +31,35 @@ class QNError:
 
 
 class QnManager:
-    def __init__(self, auth, bucket, cdn_host, public):
-        self.auth = auth
-        self.bucket = bucket
-        self.cdn_host = cdn_host
+    _auth = None
+    _auth_keys = None
+
+    def __init__(self, bucket, cdn_host, public):
+        """
+        :param bucket: 存储空间配置项
+        :param cdn_host: CDN域名配置项
+        """
+        self._bucket = bucket
+        self._cdn_host = cdn_host
         self.public = public
 
+    @property
+    def auth(self):
+        """七牛鉴权对象，密钥配置变化时重新构造"""
+        keys = (ACCESS_KEY.value, SECRET_KEY.value)
+        if QnManager._auth_keys != keys:
+            QnManager._auth = qiniu.Auth(access_key=keys[0], secret_key=keys[1])
+            QnManager._auth_keys = keys
+        return QnManager._auth
+
+    @property
+    def bucket(self):
+        return self._bucket.value
+
+    @property
+    def cdn_host(self):
+        return self._cdn_host.value
+
     @staticmethod
     def encode_key(key):
         key = key.replace('@', '@@')
@@ -134,5 +154,5 @@ class QnManager:
         return self.deal_manage_res(target, access_token)
 
 
-qn_res_manager = QnManager(_AUTH, RES_BUCKET, RES_CDN_HOST, public=False)
-qn_public_manager = QnManager(_AUTH, PUBLIC_BUCKET, PUBLIC_CDN_HOST, public=True)
+qn_res_manager = QnManager(RES_BUCKET, RES_CDN_HOST, public=False)
+qn_public_manager = QnManager(PUBLIC_BUCKET, PUBLIC_CDN_HOST, public=True)
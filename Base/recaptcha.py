@@ -1,8 +1,8 @@
 import requests
 
-from Config.models import Config, CI
+from Config.models import LazyConfig, CI
 
-G_RECAPTCHA_SECRET = Config.get_value_by_key(CI.G_RECAPTCHA_SECRET)
+G_RECAPTCHA_SECRET = LazyConfig(CI.G_RECAPTCHA_SECRET)
 
 
 class Recaptcha:
@@ -12,7 +12,7 @@ class Recaptcha:
     def verify(response):
         try:
             resp = requests.post(Recaptcha.API_URL, {
-                'secret': G_RECAPTCHA_SECRET,
+                'secret': G_RECAPTCHA_SECRET.value,
                 'response': response,
             })
             success = resp.json()['success']
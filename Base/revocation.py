@@ -0,0 +1,76 @@
+""" token注销
+
+注销的token以摘要存于RevokedToken表。每个进程维护一个布隆过滤器，
+每隔REVOCATION_SYNC_INTERVAL秒按自增ID增量同步新注销的token，
+绝大多数未注销的token只需一次过滤器探测即可放行，命中过滤器时才查询数据库确认
+自增ID可能不按顺序提交（如MySQL），每次同步重新扫描最近REVOCATION_SYNC_OVERLAP个ID，
+较晚提交的小ID也能在下次同步时载入
+"""
+import threading
+import time
+
+from Base.bloom import BloomFilter
+from account.settings import REVOCATION_SYNC_INTERVAL, REVOCATION_REBUILD_INTERVAL, \
+    REVOCATION_BLOOM_CAPACITY, REVOCATION_SYNC_OVERLAP
+
+
+class Revocation:
+    _bloom = None
+    _last_id = 0
+    _last_sync = 0
+    _last_build = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _rebuild(cls, capacity):
+        """在新过滤器中载入全部记录后再替换，替换前的查询仍使用旧过滤器"""
+        from User.models import RevokedToken
+        bloom = BloomFilter(capacity)
+        last_id = cls._load(RevokedToken, bloom, 0)
+        cls._bloom, cls._last_id = bloom, last_id
+        cls._last_build = time.time()
+
+    @staticmethod
+    def _load(model, bloom, after_id):
+        """将ID大于after_id的记录加入过滤器，返回最大ID"""
+        last_id = after_id
+        for pk, token_id in model.objects.filter(
+                pk__gt=after_id).order_by('pk').values_list('pk', 'token_id'):
+            digest = bytes.fromhex(token_id)
+            if digest not in bloom:
+                bloom.add(digest)
+            last_id = max(last_id, pk)
+        return last_id
+
+    @classmethod
+    def _sync(cls):
+        crt_time = time.time()
+        if cls._bloom is not None and crt_time - cls._last_sync < REVOCATION_SYNC_INTERVAL:
+            return
+        with cls._lock:
+            if cls._bloom is not None and crt_time - cls._last_sync < REVOCATION_SYNC_INTERVAL:
+                return
+            from User.models import RevokedToken
+            if cls._bloom is None or crt_time - cls._last_build > REVOCATION_REBUILD_INTERVAL:
+                cls._rebuild(REVOCATION_BLOOM_CAPACITY)
+            else:
+                cls._last_id = cls._load(
+                    RevokedToken, cls._bloom, max(cls._last_id - REVOCATION_SYNC_OVERLAP, 0))
+            if cls._bloom.full():
+                cls._rebuild(cls._bloom.capacity * 2)
+            cls._last_sync = crt_time
+
+    @classmethod
+    def is_revoked(cls, digest: bytes):
+        cls._sync()
+        if digest not in cls._bloom:
+            return False
+        from User.models import RevokedToken
+        return RevokedToken.objects.filter(token_id=digest.hex()).exists()
+
+    @classmethod
+    def revoke(cls, digest: bytes, expire_time):
+        from User.models import RevokedToken
+        RevokedToken.create(digest.hex(), expire_time)
+        cls._sync()
+        cls._bloom.add(digest)
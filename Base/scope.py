@@ -1,19 +1,110 @@
-from App.models import Scope
+""" 权限注册表
+
+一次查询载入全部权限，按名称与ID索引，视图与认证装饰器使用同一批权限对象
+新增或修改权限后调用ScopeRegistry.reload，版本号写入多进程共享的缓存（见App.checks），
+各进程在SCOPE_REGISTRY_CHECK_INTERVAL秒内重新载入
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+from App.models import Scope, AppError
+from account.settings import SCOPE_REGISTRY_CHECK_INTERVAL
+
+
+# 本进程调用reload后的版本，下次访问时必定重新载入
+_STALE_VERSION = object()
+
+
+class ScopeRegistry:
+    VERSION_KEY = 'scope-registry-version'
+
+    _by_name = None
+    _by_id = None
+    _always = None
+    _version = None
+    _generation = 0
+    _last_check = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls):
+        """载入到新的字典后再替换，其他线程在替换前仍读取旧的注册表"""
+        scopes = list(Scope.objects.order_by('pk'))
+        by_name = {scope.name: scope for scope in scopes}
+        by_id = {scope.pk: scope for scope in scopes}
+        always = [scope for scope in scopes if scope.always]
+        cls._by_name, cls._by_id, cls._always = by_name, by_id, always
+        cls._generation += 1
+
+    @classmethod
+    def _check(cls):
+        crt_time = time.time()
+        if cls._by_name is not None and crt_time - cls._last_check < SCOPE_REGISTRY_CHECK_INTERVAL:
+            return
+
+        with cls._lock:
+            if cls._by_name is None:
+                cls._version = cache.get(cls.VERSION_KEY)
+                cls._load()
+            elif crt_time - cls._last_check >= SCOPE_REGISTRY_CHECK_INTERVAL:
+                version = cache.get(cls.VERSION_KEY)
+                if version != cls._version:
+                    cls._version = version
+                    cls._load()
+            cls._last_check = crt_time
+
+    @classmethod
+    def reload(cls):
+        """通知所有进程重新载入，本进程下次访问时立即载入"""
+        cache.set(cls.VERSION_KEY, time.time_ns(), None)
+        with cls._lock:
+            cls._version = _STALE_VERSION
+            cls._last_check = 0
+
+    @classmethod
+    def generation(cls):
+        """本进程的载入次数，每次重新载入后变化，可作为派生数据的缓存键"""
+        cls._check()
+        return cls._generation
+
+    @classmethod
+    def get(cls, name):
+        cls._check()
+        scope = cls._by_name.get(name)
+        if scope is None:
+            raise AppError.SCOPE_NOT_FOUND
+        return scope
+
+    @classmethod
+    def get_by_id(cls, sid):
+        cls._check()
+        scope = cls._by_id.get(sid)
+        if scope is None:
+            raise AppError.SCOPE_NOT_FOUND
+        return scope
+
+    @classmethod
+    def always(cls):
+        """一直可选的权限，每次载入时计算一次"""
+        cls._check()
+        return list(cls._always)
+
+    @classmethod
+    def all(cls):
+        cls._check()
+        return list(cls._by_id.values())
 
 
 class ScopeInstance:
-    read_base_info = Scope.get_by_name('readBaseInfo')
-    write_base_info = Scope.get_by_name('writeBaseInfo')
-    send_email = Scope.get_by_name('sendEmail')
-    send_mobile = Scope.get_by_name('sendMobile')
-    read_app_list = Scope.get_by_name('readMyAppList')
-    read_phone = Scope.get_by_name('readPhone')
-    assert read_base_info
-    assert write_base_info
-    assert send_email
-    assert send_mobile
-    assert read_app_list
-    assert read_phone
+    """内置权限名称，由ScopeRegistry解析为权限对象"""
+    read_base_info = 'readBaseInfo'
+    write_base_info = 'writeBaseInfo'
+    send_email = 'sendEmail'
+    send_mobile = 'sendMobile'
+    read_app_list = 'readMyAppList'
+    read_phone = 'readPhone'
 
 
 SI = ScopeInstance
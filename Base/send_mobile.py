@@ -5,9 +5,9 @@ import requests
 from django.utils.crypto import get_random_string
 
 from Base.session import Session
-from Config.models import Config, CI
+from Config.models import LazyConfig, CI
 
-yunpian_appkey = Config.get_value_by_key(CI.YUNPIAN_APPKEY)
+yunpian_appkey = LazyConfig(CI.YUNPIAN_APPKEY)
 
 
 class SendMobile:
@@ -45,7 +45,7 @@ class SendMobile:
         code = get_random_string(length=6, allowed_chars="1234567890")
         text = text.replace("#code#", code)
 
-        SendMobile._send_sms(yunpian_appkey, text, mobile)
+        SendMobile._send_sms(yunpian_appkey.value, text, mobile)
         Session.save_captcha(request, SendMobile.PHONE, code)
         Session.save(request, SendMobile.PHONE_NUMBER, mobile)
 
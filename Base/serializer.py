@@ -0,0 +1,45 @@
+""" 批量序列化
+
+模型以SELECT_RELATED、PREFETCH_RELATED声明字段依赖的关联，
+按所需字段一次性预取，使一页数据的查询数与条数无关
+"""
+from django.db.models import QuerySet, prefetch_related_objects
+
+
+def _field_names(fields):
+    return [field[0] if isinstance(field, tuple) else field for field in fields]
+
+
+def with_related(objects, fields):
+    """
+    为字段所需的关联添加select_related/prefetch_related
+    :param objects: QuerySet或模型对象列表
+    """
+    if isinstance(objects, QuerySet):
+        model = objects.model
+    elif objects:
+        model = type(objects[0])
+    else:
+        return objects
+
+    names = _field_names(fields)
+    select = [model.SELECT_RELATED[name] for name in names
+              if name in getattr(model, 'SELECT_RELATED', {})]
+    prefetch = [model.PREFETCH_RELATED[name] for name in names
+                if name in getattr(model, 'PREFETCH_RELATED', {})]
+
+    if isinstance(objects, QuerySet):
+        if select:
+            objects = objects.select_related(*select)
+        if prefetch:
+            objects = objects.prefetch_related(*prefetch)
+        return objects
+
+    objects = list(objects)
+    prefetch_related_objects(objects, *select, *prefetch)
+    return objects
+
+
+def serialize(objects, fields):
+    """与逐个调用dictify(*fields)结果相同"""
+    return [o.dictify(*fields) for o in with_related(objects, fields)]
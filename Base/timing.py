@@ -0,0 +1,110 @@
+""" 认证装饰器分阶段计时
+
+AUTH_TIMING_SINK为None时装饰器不创建计时器，没有任何额外开销
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.utils.module_loading import import_string
+
+from account.settings import AUTH_TIMING_SINK
+
+
+class PhaseTimer:
+    """记录一次请求中各阶段的耗时，mark时结束当前阶段"""
+    __slots__ = ('phases', '_last')
+
+    def __init__(self):
+        self.phases = []
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+
+class Histogram:
+    # 桶上界，单位毫秒
+    BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def d(self):
+        return dict(
+            count=self.count,
+            sum_ms=self.sum,
+            buckets=dict(zip(list(map(str, self.BOUNDS)) + ['+Inf'], self.counts)),
+        )
+
+
+class LogSink:
+    """每次请求输出一行日志"""
+    def __init__(self):
+        self.logger = logging.getLogger('account.auth.timing')
+
+    def record(self, view, phases):
+        self.logger.info('%s %s', view, ' '.join(
+            '%s=%.3fms' % (phase, seconds * 1000) for phase, seconds in phases))
+
+
+class MemorySink:
+    """进程内按视图、阶段累计直方图，可通过/base/auth-timing查看"""
+    def __init__(self):
+        self.histograms = dict()
+        self._lock = threading.Lock()
+
+    def record(self, view, phases):
+        with self._lock:
+            for phase, seconds in phases:
+                histogram = self.histograms.get((view, phase))
+                if histogram is None:
+                    histogram = self.histograms[(view, phase)] = Histogram()
+                histogram.observe(seconds * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            views = dict()
+            for (view, phase), histogram in self.histograms.items():
+                views.setdefault(view, dict())[phase] = histogram.d()
+            return views
+
+
+class Timing:
+    SINKS = dict(
+        log=LogSink,
+        memory=MemorySink,
+    )
+
+    sink = None
+
+    @classmethod
+    def setup(cls, sink):
+        """
+        :param sink: None关闭计时，'log'、'memory'或sink类的导入路径
+        """
+        if sink is None:
+            cls.sink = None
+        elif sink in cls.SINKS:
+            cls.sink = cls.SINKS[sink]()
+        else:
+            cls.sink = import_string(sink)()
+
+    @classmethod
+    def snapshot(cls):
+        if isinstance(cls.sink, MemorySink):
+            return cls.sink.snapshot()
+        return None
+
+
+Timing.setup(AUTH_TIMING_SINK)
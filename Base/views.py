@@ -5,6 +5,7 @@ from Base import country
 from Base.auth import Auth
 from Base.recaptcha import Recaptcha
 from Base.send_mobile import SendMobile
+from Base.timing import Timing
 from User.models import User
 
 PM_PHONE = P('phone', '手机号')
@@ -17,6 +18,17 @@ class Error(View):
         return E.all()
 
 
+class AuthTiming(View):
+    @staticmethod
+    @Auth.require_login(deny_auth_token=True, require_root=True)
+    def get(_):
+        """ GET /api/base/auth-timing
+
+        认证各阶段耗时直方图，仅在使用进程内sink时可用
+        """
+        return Timing.snapshot()
+
+
 def process_lang(lang):
     """format language"""
     if lang not in ['cn', 'en']:
@@ -0,0 +1,48 @@
+""" JWT编解码微基准
+
+对比PyJWT通用路径与预置密钥的HMACCodec每秒编解码次数：
+python manage.py bench_jwt --number 20000
+"""
+import time
+import timeit
+
+import jwt
+from django.core.management import BaseCommand
+
+from Base.jtoken import HMACCodec, orjson, JWType
+
+
+class Command(BaseCommand):
+    help = 'JWT编解码微基准，对比PyJWT通用路径与HMACCodec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000, help='每轮执行次数')
+        parser.add_argument('--algorithm', default='HS256', choices=sorted(HMACCodec.DIGESTS))
+
+    def handle(self, *args, **options):
+        number = options['number']
+        algorithm = options['algorithm']
+        key = 'benchmark-secret-key-0123456789abcdef'
+        payload = dict(
+            type=JWType.AUTH_TOKEN,
+            user_app_id='AbCdEfGh',
+            ctime=time.time(),
+            expire=30 * 24 * 60 * 60,
+        )
+
+        codec = HMACCodec(key, algorithm)
+        token = codec.encode(payload)
+        assert jwt.decode(token, key, algorithms=[algorithm]) == codec.decode(token)
+
+        cases = [
+            ('PyJWT encode', lambda: jwt.encode(payload, key, algorithm=algorithm)),
+            ('codec encode', lambda: codec.encode(payload)),
+            ('PyJWT decode', lambda: jwt.decode(token, key, algorithms=[algorithm])),
+            ('codec decode', lambda: codec.decode(token)),
+        ]
+
+        self.stdout.write('%s, json: %s, number: %s' % (
+            algorithm, 'orjson' if orjson else 'json', number))
+        for name, func in cases:
+            seconds = min(timeit.repeat(func, number=number, repeat=3))
+            self.stdout.write('%-14s %12.0f ops/sec' % (name, number / seconds))
@@ -0,0 +1,17 @@
+""" 导出配置快照
+
+数据库不可用时，进程可从快照读取配置启动：
+python manage.py config_snapshot
+"""
+from django.core.management import BaseCommand
+
+from Config.models import ConfigCache
+from account.settings import CONFIG_SNAPSHOT_FILE
+
+
+class Command(BaseCommand):
+    help = '导出全部配置到CONFIG_SNAPSHOT_FILE'
+
+    def handle(self, *args, **options):
+        count = ConfigCache.write_snapshot()
+        self.stdout.write('%s configs written to %s' % (count, CONFIG_SNAPSHOT_FILE))
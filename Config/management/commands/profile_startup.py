@@ -0,0 +1,157 @@
+""" 启动耗时分析
+
+在子进程中以python -X importtime重新启动项目（django.setup并载入全部路由），
+按耗时列出各模块的导入时间，以及导入期间发出的数据库查询与其所在源码行：
+python manage.py profile_startup --limit 30
+python manage.py profile_startup --max-time 1500 --max-queries 0
+
+超出--max-time（毫秒）或--max-queries时命令以非零状态退出，可放在CI中防止启动变慢
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from account.settings import BASE_DIR
+
+_RESULT_PREFIX = '@@profile_startup@@'
+_IMPORT_TIME_PREFIX = 'import time:'
+_CHILD_CODE = 'from Config.management.commands.profile_startup import profile_child; profile_child()'
+
+
+def _query_source(frame):
+    """
+    查询在项目代码中的位置
+    :return: (最内层项目代码所在行, 正在导入的项目模块)
+    """
+    this_file = os.path.abspath(__file__)
+    source = module = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(BASE_DIR) and filename != this_file:
+            if source is None:
+                source = '%s:%s' % (os.path.relpath(filename, BASE_DIR), frame.f_lineno)
+            if frame.f_code.co_name == '<module>':
+                module = frame.f_globals.get('__name__')
+                break
+        frame = frame.f_back
+    return source, module
+
+
+def profile_child():
+    """子进程入口，启动项目并输出启动耗时与查询"""
+    start = time.perf_counter()
+
+    import django
+    from django.conf import settings
+    from django.db import connections
+
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        query_start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            source, module = _query_source(sys._getframe(1))
+            queries.append(dict(
+                sql=sql,
+                ms=(time.perf_counter() - query_start) * 1000,
+                source=source,
+                module=module,
+            ))
+
+    for alias in settings.DATABASES:
+        connections[alias].execute_wrappers.append(wrapper)
+
+    django.setup()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+    sys.stdout.write(_RESULT_PREFIX + json.dumps(dict(
+        boot_ms=(time.perf_counter() - start) * 1000,
+        queries=queries,
+    )) + '\n')
+
+
+def parse_import_time(lines):
+    """解析-X importtime输出，返回[(模块, 自身微秒, 累计微秒)]"""
+    modules = []
+    for line in lines:
+        if not line.startswith(_IMPORT_TIME_PREFIX):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len(_IMPORT_TIME_PREFIX):].split('|')
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue  # 表头
+    return modules
+
+
+class Command(BaseCommand):
+    help = '分析项目启动耗时：模块导入时间与导入期间的数据库查询'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='列出的模块数')
+        parser.add_argument('--max-time', type=float, default=None, help='启动耗时上限，毫秒')
+        parser.add_argument('--max-queries', type=int, default=None, help='启动期间查询数上限')
+
+    def handle(self, *args, **options):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _CHILD_CODE],
+            cwd=BASE_DIR,
+            env=os.environ.copy(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        stderr = process.stderr.splitlines()
+        result = None
+        for line in process.stdout.splitlines():
+            if line.startswith(_RESULT_PREFIX):
+                result = json.loads(line[len(_RESULT_PREFIX):])
+        if process.returncode != 0 or result is None:
+            errors = [line for line in stderr if not line.startswith(_IMPORT_TIME_PREFIX)]
+            raise CommandError('项目启动失败：\n%s' % '\n'.join(errors[-20:]))
+
+        modules = parse_import_time(stderr)
+        self.report_modules(modules, options['limit'])
+        self.report_packages(modules, options['limit'])
+        self.report_queries(result['queries'])
+
+        boot_ms, query_count = result['boot_ms'], len(result['queries'])
+        self.stdout.write('\nboot %.1f ms (with importtime overhead), %s queries' % (
+            boot_ms, query_count))
+
+        exceeded = []
+        if options['max_time'] is not None and boot_ms > options['max_time']:
+            exceeded.append('启动耗时%.1fms超出%sms' % (boot_ms, options['max_time']))
+        if options['max_queries'] is not None and query_count > options['max_queries']:
+            exceeded.append('启动查询%s条超出%s条' % (query_count, options['max_queries']))
+        if exceeded:
+            raise CommandError('，'.join(exceeded))
+
+    def report_modules(self, modules, limit):
+        self.stdout.write('modules by self time:')
+        self.stdout.write('%10s %10s  %s' % ('self ms', 'cum ms', 'module'))
+        for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:limit]:
+            self.stdout.write('%10.1f %10.1f  %s' % (self_us / 1000, cumulative_us / 1000, name))
+
+    def report_packages(self, modules, limit):
+        packages = dict()
+        for name, self_us, _ in modules:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+
+        self.stdout.write('\ntop-level packages by total self time:')
+        for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:limit]:
+            self.stdout.write('%10.1f  %s' % (self_us / 1000, package))
+
+    def report_queries(self, queries):
+        self.stdout.write('\nqueries during startup:')
+        for query in sorted(queries, key=lambda q: -q['ms']):
+            self.stdout.write('%10.2f  %s (%s)\n            %s' % (
+                query['ms'], query['source'], query['module'], query['sql'][:160]))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.5 on 2026-10-17 14:05
+"""
+Base.id_allocator的ID序列表
+Base不是Django应用，不能定义模型；使用者User与App之间App依赖User，
+序列放在两者都不依赖、也不依赖两者的Config中
+"""
+
+import SmartDjango.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Config', '0002_auto_20191008_2145'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', SmartDjango.models.fields.CharField(max_length=32, unique=True)),
+                ('next', SmartDjango.models.fields.BigIntegerField(default=0, verbose_name='下一块的起始序号')),
+            ],
+            options={
+                'abstract': False,
+                'default_manager_name': 'objects',
+            },
+        ),
+    ]
@@ -2,7 +2,23 @@
 
 系统配置类
 """
+import json
+import logging
+import os
+import threading
+import time
+
 from SmartDjango import models, E
+from django.db import DatabaseError, IntegrityError, connections, router, transaction
+
+from account.settings import CONFIG_VERSION_CHECK_INTERVAL, CONFIG_SNAPSHOT_FILE
+
+logger = logging.getLogger(__name__)
+
+# 从快照载入时的配置版本，与任何数据库中的版本都不相等，数据库恢复后即重新载入
+_SNAPSHOT_VERSION = object()
+# 本进程写入配置后的版本，下次读取时必定重新载入
+_STALE_VERSION = object()
 
 
 @E.register(id_processor=E.idp_cls_prefix())
@@ -37,36 +53,171 @@ class Config(models.Model):
     @classmethod
     def get_value_by_key(cls, key, default=None):
         try:
-            config = cls.get_config_by_key(key)
-            return config.value
+            return ConfigCache.get(key, default)
         except Exception:
             return default
 
     @classmethod
     def update_value(cls, key, value):
-        cls.validator(locals())
+        cls.update_many({key: value})
+
+    @classmethod
+    def update_many(cls, values):
+        """
+        批量写入配置，一条upsert语句完成，配置版本只更新一次
+        :param values: {key: value}
+        """
+        for key, value in values.items():
+            cls.validator(dict(key=key, value=value))
+
+        values = dict(values)
+        values[CI.CONFIG_VERSION] = str(time.time_ns())
 
         try:
-            config = cls.get_config_by_key(key)
-            config.value = value
-            config.save()
-        except E as e:
-            if e.eis(ConfigError.CONFIG_NOT_FOUND):
-                try:
-                    config = cls(
-                        key=key,
-                        value=value,
-                    )
-                    config.save()
-                except Exception as err:
-                    raise ConfigError.CREATE_CONFIG(debug_message=err)
-            else:
-                raise e
+            with transaction.atomic():
+                cls._upsert(values)
         except Exception as err:
             raise ConfigError.CREATE_CONFIG(debug_message=err)
+        ConfigCache.invalidate()
+
+    @classmethod
+    def _upsert(cls, values):
+        """INSERT ... ON DUPLICATE KEY UPDATE（MySQL）或ON CONFLICT（SQLite、PostgreSQL）"""
+        connection = connections[router.db_for_write(cls)]
+        qn = connection.ops.quote_name
+        table, key, value = qn(cls._meta.db_table), qn('key'), qn('value')
+
+        sql = 'INSERT INTO %s (%s, %s) VALUES %s' % (
+            table, key, value, ', '.join(['(%s, %s)'] * len(values)))
+        if connection.vendor == 'mysql':
+            sql += ' ON DUPLICATE KEY UPDATE %s = VALUES(%s)' % (value, value)
+        else:
+            sql += ' ON CONFLICT (%s) DO UPDATE SET %s = excluded.%s' % (key, value, value)
+
+        params = [item for pair in values.items() for item in pair]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+class IdSequence(models.Model):
+    """
+    ID序列，各进程按块领取序号，由Base.id_allocator排列为ID
+    Base不是Django应用，不能定义模型；使用者User与App之间App依赖User，
+    序列放在两者都不依赖、也不依赖两者的Config中，与配置同为系统级的表
+    """
+    name = models.CharField(
+        max_length=32,
+        unique=True,
+    )
+    next = models.BigIntegerField(
+        default=0,
+        verbose_name='下一块的起始序号',
+    )
+
+    @classmethod
+    def take(cls, name, size):
+        """
+        领取名为name的序列中连续size个序号
+        :return: 起始序号
+        """
+        sequences = cls.objects.filter(name=name)
+        with transaction.atomic():
+            if not sequences.update(next=models.F('next') + size):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, next=size)
+                    return 0
+                except IntegrityError:
+                    # 另一个进程刚刚创建了这个序列
+                    sequences.update(next=models.F('next') + size)
+            return sequences.values_list('next', flat=True).get() - size
+
+
+class ConfigCache:
+    """
+    进程内配置缓存，一次查询载入全部配置
+    每隔CONFIG_VERSION_CHECK_INTERVAL秒读取一次配置版本，版本变化时重新载入
+    数据库不可用时从CONFIG_SNAPSHOT_FILE快照启动，数据库恢复后自动切换
+    """
+    _values = None
+    _version = None
+    _last_check = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls):
+        try:
+            cls._values = dict(Config.objects.values_list('key', 'value'))
+        except DatabaseError as err:
+            if cls._values is not None or not os.path.exists(CONFIG_SNAPSHOT_FILE):
+                raise
+            logger.warning('Config database unavailable, booting from snapshot: %s', err)
+            cls._values = cls.read_snapshot()
+            cls._version = _SNAPSHOT_VERSION
+            return
+        cls._version = cls._values.get(CI.CONFIG_VERSION)
+
+    @staticmethod
+    def read_snapshot():
+        with open(CONFIG_SNAPSHOT_FILE, encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def write_snapshot():
+        values = dict(Config.objects.values_list('key', 'value'))
+        fd = os.open(CONFIG_SNAPSHOT_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(values, f, ensure_ascii=False, indent=2)
+        return len(values)
+
+    @classmethod
+    def _check(cls):
+        crt_time = time.time()
+        if cls._values is not None and crt_time - cls._last_check < CONFIG_VERSION_CHECK_INTERVAL:
+            return
+        with cls._lock:
+            if cls._values is None:
+                cls._load()
+            elif crt_time - cls._last_check >= CONFIG_VERSION_CHECK_INTERVAL:
+                try:
+                    version = Config.objects.filter(key=CI.CONFIG_VERSION).values_list(
+                        'value', flat=True).first()
+                    if version != cls._version:
+                        cls._load()
+                except DatabaseError as err:
+                    logger.warning('Config version check failed, keep cached values: %s', err)
+            cls._last_check = crt_time
+
+    @classmethod
+    def get(cls, key, default=None):
+        cls._check()
+        return cls._values.get(key, default)
+
+    @classmethod
+    def invalidate(cls):
+        """标记为过期，下次读取时重新载入；重新载入前其他线程仍读取旧配置，不会读到空值"""
+        cls._version = _STALE_VERSION
+        cls._last_check = 0
+
+
+class LazyConfig:
+    """惰性配置项，读取value时才访问配置缓存"""
+    def __init__(self, key, default=None, process=None):
+        self.key = key
+        self.default = default
+        self.process = process
+
+    @property
+    def value(self):
+        value = Config.get_value_by_key(self.key, self.default)
+        if self.process and value is not None:
+            value = self.process(value)
+        return value
 
 
 class ConfigInstance:
+    CONFIG_VERSION = 'config-version'
+
     HOST = 'host'
     JWT_ENCODE_ALGO = 'jwt-encode-algo'
     PROJECT_SECRET_KEY = 'project-secret-key'
@@ -5,4 +5,6 @@ from OAuth import views
 urlpatterns = [
     path('', views.OAuth.as_view()),
     path('token', views.OAuthToken.as_view()),
+    path('introspect', views.OAuthIntrospect.as_view()),
+    path('jwks', views.JWKS.as_view()),
 ]
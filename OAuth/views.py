@@ -1,11 +1,20 @@
-from SmartDjango import Analyse, P
+from SmartDjango import Analyse, P, ModelError
+from django.http import JsonResponse
 from django.views import View
 
 from App.models import UserApp, AppError, AppP
 from Base.auth import Auth, AuthError
-from Base.jtoken import JWType, JWT
+from Base.jtoken import JWType, JWT, KeyRing
 
 OAUTH_TOKEN_EXPIRE_TIME = 30 * 24 * 60 * 60
+JWKS_MAX_AGE = 60 * 60
+INTROSPECT_MAX_TOKENS = 100
+
+
+def tokens_process(tokens):
+    if not isinstance(tokens, list) or len(tokens) > INTROSPECT_MAX_TOKENS:
+        raise ModelError.FIELD_FORMAT
+    return tokens
 
 
 class OAuth(View):
@@ -69,8 +78,40 @@ class OAuthToken(View):
                 type=JWType.AUTH_TOKEN,
             ),
             expire_second=OAUTH_TOKEN_EXPIRE_TIME,
+            asymmetric=True,
         )
         dict_['token'] = token
         dict_['avatar'] = user_app.user.get_avatar_url()
 
         return dict_
+
+
+class OAuthIntrospect(View):
+    @staticmethod
+    @Analyse.r([
+        AppP.app,
+        AppP.secret.clone().rename('app_secret'),
+        P('tokens', '认证口令列表').process(tokens_process),
+    ])
+    def post(r):
+        """POST /api/oauth/introspect
+
+        应用批量校验第三方认证token
+        """
+        app = r.d.app
+        if not app.authentication(r.d.app_secret):
+            raise AppError.APP_SECRET
+
+        return Auth.introspect(app, r.d.tokens)
+
+
+class JWKS(View):
+    @staticmethod
+    def get(_):
+        """GET /api/oauth/jwks
+
+        第三方认证token的签名公钥，供应用离线验证
+        """
+        response = JsonResponse(dict(keys=KeyRing.jwks()))
+        response['Cache-Control'] = 'public, max-age=%s' % JWKS_MAX_AGE
+        return response
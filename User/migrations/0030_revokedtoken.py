@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:30
+
+import SmartDjango.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0029_auto_20191008_2145'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_id', SmartDjango.models.fields.CharField(max_length=64, unique=True, verbose_name='token的sha256摘要')),
+                ('expire_time', SmartDjango.models.fields.FloatField(db_index=True, verbose_name='token过期时间，过期后记录可被清除')),
+            ],
+            options={
+                'abstract': False,
+                'default_manager_name': 'objects',
+            },
+        ),
+    ]
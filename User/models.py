@@ -8,6 +8,7 @@ import re
 from SmartDjango import models, E, P
 from django.utils.crypto import get_random_string
 
+from Base.id_allocator import IdAllocator, insert_with_ids
 from Base.idcard import IDCardError
 
 
@@ -24,6 +25,11 @@ class UserError:
     BIRTHDAY_FORMAT = E("错误的生日时间")
     PHONE_EXIST = E("手机号已注册")
     QITIAN_EXIST = E("已存在此齐天号")
+    REVOKE_TOKEN = E("注销认证失败")
+
+
+USER_STR_IDS = IdAllocator('user-str-id', 6)
+QITIAN_IDS = IdAllocator('qitian', 8)
 
 
 class User(models.Model):
@@ -162,23 +168,11 @@ class User(models.Model):
 
     @classmethod
     def get_unique_id(cls):
-        while True:
-            user_str_id = get_random_string(length=6)
-            try:
-                cls.get_by_str_id(user_str_id)
-            except E as e:
-                if e.eis(UserError.USER_NOT_FOUND):
-                    return user_str_id
+        return USER_STR_IDS.next()
 
     @classmethod
     def get_unique_qitian(cls):
-        while True:
-            qitian_id = get_random_string(length=8)
-            try:
-                cls.get_by_qitian(qitian_id)
-            except E as e:
-                if e.eis(UserError.USER_NOT_FOUND):
-                    return qitian_id
+        return QITIAN_IDS.next()
 
     @staticmethod
     def _valid_qitian(qitian):
@@ -216,7 +210,6 @@ class User(models.Model):
 
         try:
             user = cls(
-                qitian=cls.get_unique_qitian(),
                 phone=phone,
                 password=hashed_password,
                 salt=salt,
@@ -224,12 +217,11 @@ class User(models.Model):
                 nickname='',
                 description=None,
                 qitian_modify_time=0,
-                user_str_id=cls.get_unique_id(),
                 birthday=None,
                 verify_status=cls.VERIFY_STATUS_UNVERIFIED,
                 is_dev=False,
             )
-            user.save()
+            insert_with_ids(user, qitian=QITIAN_IDS, user_str_id=USER_STR_IDS)
         except Exception as err:
             raise UserError.CREATE_USER(debug_message=err)
         return user
@@ -239,6 +231,7 @@ class User(models.Model):
         import datetime
         self.pwd_change_time = datetime.datetime.now().timestamp()
         self.save()
+        self._invalidate_auth_epoch()
 
     def change_password(self, password, old_password):
         """修改密码"""
@@ -248,6 +241,15 @@ class User(models.Model):
         import datetime
         self.pwd_change_time = datetime.datetime.now().timestamp()
         self.save()
+        self._invalidate_auth_epoch()
+
+    def _invalidate_auth_epoch(self):
+        from Base.epoch import AuthEpoch
+        AuthEpoch.invalidate(AuthEpoch.USER, self.user_str_id)
+
+    def _invalidate_premise_cache(self):
+        from Base.premise_checker import PremiseCache
+        PremiseCache.invalidate(self)
 
     @staticmethod
     def _hash(s):
@@ -312,16 +314,20 @@ class User(models.Model):
     def _readable_allow_qitian_modify(self):
         return int(self.allow_qitian_modify())
 
+    D_OAUTH_FIELDS = ('avatar', 'nickname', 'description')
+    D_BASE_FIELDS = ('user_str_id', 'avatar', 'nickname', 'description')
+    D_FIELDS = ('birthday', 'user_str_id', 'qitian', 'avatar', 'nickname',
+                'description', 'allow_qitian_modify', 'verify_status',
+                'verify_type', 'is_dev')
+
     def d_oauth(self):
-        return self.dictify('avatar', 'nickname', 'description')
+        return self.dictify(*self.D_OAUTH_FIELDS)
 
     def d_base(self):
-        return self.dictify('user_str_id', 'avatar', 'nickname', 'description')
+        return self.dictify(*self.D_BASE_FIELDS)
 
     def d(self):
-        return self.dictify('birthday', 'user_str_id', 'qitian', 'avatar', 'nickname',
-                           'description', 'allow_qitian_modify', 'verify_status',
-                           'verify_type', 'is_dev')
+        return self.dictify(*self.D_FIELDS)
 
     @classmethod
     def authenticate(cls, qitian, phone, password):
@@ -401,6 +407,7 @@ class User(models.Model):
         self.description = description
         self.birthday = birthday
         self.save()
+        self._invalidate_premise_cache()
 
     def update_card_info(self, real_name, male, idcard, birthday):
         self.real_name = real_name
@@ -411,20 +418,49 @@ class User(models.Model):
             self.save()
         except Exception as err:
             return IDCardError.AUTO_VERIFY_FAILED(debug_message=err)
+        self._invalidate_premise_cache()
 
     def update_verify_status(self, status):
         self.verify_status = status
         self.save()
+        self._invalidate_premise_cache()
 
     def update_verify_type(self, verify_type):
         self.real_verify_type = verify_type
         self.save()
+        self._invalidate_premise_cache()
 
     def developer(self):
         self.is_dev = True
         self.save()
 
 
+class RevokedToken(models.Model):
+    """已注销的token"""
+    token_id = models.CharField(
+        verbose_name='token的sha256摘要',
+        max_length=64,
+        unique=True,
+    )
+    expire_time = models.FloatField(
+        verbose_name='token过期时间，过期后记录可被清除',
+        db_index=True,
+    )
+
+    @classmethod
+    def create(cls, token_id, expire_time):
+        try:
+            cls.objects.get_or_create(token_id=token_id, defaults=dict(expire_time=expire_time))
+        except Exception as err:
+            raise UserError.REVOKE_TOKEN(debug_message=err)
+
+    @classmethod
+    def purge(cls):
+        """清除已经过期的注销记录，返回清除的记录数"""
+        crt_time = datetime.datetime.now().timestamp()
+        return cls.objects.filter(expire_time__lt=crt_time).delete()[0]
+
+
 class UserP:
     birthday, password, nickname, description, qitian, idcard, male, real_name = User.P(
         'birthday', 'password', 'nickname', 'description', 'qitian', 'idcard', 'male',
@@ -14,4 +14,5 @@ urlpatterns = [
     path('verify', views.Verify.as_view()),
     path('dev', views.Dev.as_view()),
     path('phone', views.UserPhone.as_view()),
+    path('@purge-revoked-token', views.purge_revoked_token),
 ]
@@ -19,7 +19,7 @@ from Base.qn import qn_public_manager, qn_res_manager
 from Base.send_mobile import SendMobile
 from Base.session import Session, SessionError
 
-from User.models import User, UserP
+from User.models import User, UserP, RevokedToken
 
 
 class UserV(View):
@@ -101,6 +101,15 @@ class Token(View):
             user = User.authenticate(login_value, None, password)
         return Auth.get_login_token(user)
 
+    @staticmethod
+    @Auth.require_login()
+    def delete(r):
+        """ DELETE /api/user/token
+
+        注销当前token
+        """
+        Auth.revoke_token(r)
+
 
 class Avatar(View):
     @staticmethod
@@ -298,3 +307,12 @@ def set_unique_user_str_id(_):
     for user in User.objects.all():
         user.user_str_id = User.get_unique_id()
         user.save()
+
+
+@Analyse.r(method='GET')
+def purge_revoked_token(r):
+    """ GET /api/user/@purge-revoked-token
+
+    清除已过期的token注销记录，返回清除的记录数
+    """
+    return RevokedToken.purge()
@@ -41,7 +41,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'Config',
     'User',
-    'App',
+    'App.apps.AppConfig',
 ]
 
 MIDDLEWARE = [
@@ -52,7 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'SmartDjango.middleware.HttpPackMiddleware',
+    'Base.middleware.HttpPackMiddleware',
 ]
 
 # 增加跨域
@@ -122,6 +122,17 @@ DATABASES = {
 }
 
 
+# Cache
+# 认证纪元、权限注册表版本、要求检测结果等多进程共享的缓存，生产环境必须指向memcached或redis等共享后端
+# 进程内后端（LocMemCache、DummyCache）只适用于单进程的开发服务器与测试，部署检查（check --deploy）报错App.E001
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -165,3 +176,56 @@ STATIC_URL = '/static/'
 # ]
 
 MAX_IMAGE_SIZE = 10*1024*1024
+
+# 已验证token的进程内缓存条目数
+AUTH_TOKEN_CACHE_SIZE = 4096
+
+# 认证纪元的进程内缓存条目数、进程内存活秒数与共享缓存存活秒数
+AUTH_EPOCH_LOCAL_SIZE = 8192
+AUTH_EPOCH_LOCAL_TTL = 5
+AUTH_EPOCH_CACHE_TTL = 10
+
+# 第三方认证token的非对称签名，RS256或EdDSA，None表示沿用项目密钥HMAC签名（需要安装cryptography）
+# 私钥以<kid>.pem存放于JWT_KEY_DIR，JWT_ACTIVE_KID为None时使用文件名最大的密钥签名
+# 轮换时放入新密钥，各进程在密钥目录变化后自动重新载入；旧密钥保留至其签发的token全部过期后再删除
+JWT_ASYMMETRIC_ALGO = None
+JWT_KEY_DIR = os.path.join(BASE_DIR, 'keys')
+JWT_ACTIVE_KID = None
+
+# 认证装饰器分阶段计时：None关闭，'log'输出日志，'memory'进程内直方图，或sink类的导入路径
+AUTH_TIMING_SINK = None
+
+# token注销：增量同步间隔秒数、布隆过滤器完整重建间隔秒数、过滤器初始容量、
+# 增量同步时重新扫描的最近ID数（应大于一个同步间隔内的注销数，覆盖不按顺序提交的自增ID）
+REVOCATION_SYNC_INTERVAL = 1
+REVOCATION_REBUILD_INTERVAL = 24 * 60 * 60
+REVOCATION_BLOOM_CAPACITY = 100000
+REVOCATION_SYNC_OVERLAP = 1000
+
+# 进程内配置缓存检查配置版本的间隔秒数
+CONFIG_VERSION_CHECK_INTERVAL = 5
+
+# 配置快照，数据库不可用时用于启动，由python manage.py config_snapshot生成
+CONFIG_SNAPSHOT_FILE = os.path.join(BASE_DIR, 'config.snapshot.json')
+
+# 进程内权限注册表检查版本的间隔秒数
+SCOPE_REGISTRY_CHECK_INTERVAL = 5
+
+# 用户要求检测结果的缓存秒数，用户信息变化时通过共享缓存立即失效，失效未送达时最多过期这么久
+PREMISE_CACHE_TTL = 60
+
+# 流式应用列表每次从数据库游标读取的行数
+APP_LIST_STREAM_CHUNK = 200
+
+# 应用贝叶斯评分的先验：相当于每个应用预先有APP_MARK_PRIOR_COUNT人打了APP_MARK_PRIOR_MEAN分
+APP_MARK_PRIOR_MEAN = 3
+APP_MARK_PRIOR_COUNT = 5
+
+# 应用用户人数的分片数，与单条计数的缓存秒数
+APP_USER_NUM_SHARDS = 16
+APP_USER_NUM_CACHE_TTL = 10
+
+# ID分配：置换密钥（上线后不可更改，否则新ID可能与已有ID重复），每次领取的序号数，插入冲突时的重试次数
+ID_PERMUTATION_KEY = SECRET_KEY
+ID_BLOCK_SIZE = 100
+ID_ALLOCATE_RETRIES = 3